@@ -0,0 +1,30 @@
+import asyncio, functools
+from typing import Any, Awaitable, Callable, TypeVar
+from temporalio import activity
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+def heartbeating(fn: F) -> F:
+    """Heartbeat at a third of the heartbeat timeout for as long as the activity runs.
+
+    Goes outermost (right under @activity.defn), so ledger lookups and writes
+    done by @idempotent are covered too; otherwise a slow DB checkout there
+    could trip the short heartbeat timeout on an attempt that succeeded.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args: Any) -> Any:
+        info = activity.info()
+        if info.is_local or not info.heartbeat_timeout:
+            return await fn(*args)
+        interval = info.heartbeat_timeout.total_seconds() / 3
+        task = asyncio.ensure_future(fn(*args))
+        try:
+            while True:
+                done, _ = await asyncio.wait({task}, timeout=interval)
+                if done:
+                    return task.result()
+                activity.heartbeat()
+        finally:
+            if not task.done():
+                task.cancel()
+    return wrapper  # type: ignore[return-value]
@@ -0,0 +1,31 @@
+import functools
+from typing import Any, Awaitable, Callable, TypeVar
+from temporalio import activity
+import structlog
+
+from app.domain import store
+
+log = structlog.get_logger()
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+def idempotent(fn: F) -> F:
+    """Run a side-effecting activity at most once per workflow run + activity id.
+
+    The result is recorded in `activity_ledger` in the same round trip that
+    checks for an earlier one. A retry looks the key up first and returns the
+    recorded result without calling the downstream system again. The first
+    attempt can't have a record yet, so it skips the lookup.
+    """
+    @functools.wraps(fn)
+    async def wrapper(*args: Any) -> Any:
+        info = activity.info()
+        key = (info.workflow_id or "", info.workflow_run_id or "", info.activity_id)
+        if info.attempt > 1:
+            row = await store.get_activity_result(*key)
+            if row is not None:
+                log.info("activity_ledger_hit", activity=info.activity_type, workflow_id=key[0], attempt=info.attempt)
+                return row["result_json"]
+        result = await fn(*args)
+        return await store.record_activity_result(*key, info.activity_type, result)
+    return wrapper  # type: ignore[return-value]
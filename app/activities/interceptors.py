@@ -0,0 +1,73 @@
+import time
+from datetime import timedelta
+from typing import Any
+from temporalio import activity
+from temporalio.exceptions import ApplicationError
+from temporalio.worker import ActivityInboundInterceptor, ExecuteActivityInput, Interceptor
+
+import app.config as config
+from app.domain import store
+from app.domain.breaker import CircuitOpenError
+from app.domain.event_writer import pending_events
+from app.metrics import ACTIVITY_RETRIES, ACTIVITY_SECONDS
+
+
+class _EventFlushActivityInbound(ActivityInboundInterceptor):
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        pending: list = []
+        token = pending_events.set(pending)
+        try:
+            result = await super().execute_activity(input)
+        finally:
+            pending_events.reset(token)
+        writer = store.get_event_writer()
+        if writer is not None and config.EVENT_WRITER_FLUSH_ON_COMPLETE:
+            await writer.wait_for(pending)
+        return result
+
+
+class EventFlushInterceptor(Interceptor):
+    """Don't report an activity complete until the events it buffered are committed."""
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _EventFlushActivityInbound(next)
+
+
+class _MetricsActivityInbound(ActivityInboundInterceptor):
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        info = activity.info()
+        if info.attempt > 1:
+            ACTIVITY_RETRIES.labels(info.activity_type).inc()
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await super().execute_activity(input)
+            outcome = "ok"
+            return result
+        finally:
+            ACTIVITY_SECONDS.labels(info.activity_type, outcome).observe(time.perf_counter() - started)
+
+
+class MetricsInterceptor(Interceptor):
+    """Per-activity duration histogram and retry counter."""
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _MetricsActivityInbound(next)
+
+
+class _CircuitOpenActivityInbound(ActivityInboundInterceptor):
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        try:
+            return await super().execute_activity(input)
+        except CircuitOpenError as e:
+            # Still retryable, but the next attempt waits until the breaker lets a trial call through
+            raise ApplicationError(
+                str(e), e.dependency, type="CircuitOpen", next_retry_delay=timedelta(seconds=e.retry_after),
+            ) from e
+
+
+class CircuitOpenInterceptor(Interceptor):
+    """Fail an attempt rejected by an open circuit breaker with a next-retry hint instead of the policy's backoff."""
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _CircuitOpenActivityInbound(next)
@@ -1,10 +1,14 @@
 from temporalio import activity
 import structlog
+from app.activities.heartbeat import heartbeating
+from app.activities.idempotency import idempotent
 from app.domain import stubs, store
 
 log = structlog.get_logger()
 
 @activity.defn
+@heartbeating
+@idempotent
 async def receive_order(order_id: str, address: dict | None) -> dict:
     try:
         result = await stubs.order_received(order_id, address or {})
@@ -15,6 +19,8 @@ async def receive_order(order_id: str, address: dict | None) -> dict:
         raise
 
 @activity.defn
+@heartbeating
+@idempotent
 async def validate_order(order: dict) -> bool:
     try:
         ok = await stubs.order_validated(order)
@@ -25,6 +31,8 @@ async def validate_order(order: dict) -> bool:
         raise
 
 @activity.defn
+@heartbeating
+@idempotent
 async def charge_payment(order: dict, payment_id: str) -> dict:
     try:
         result = await stubs.payment_charged(order, payment_id)
@@ -35,6 +43,8 @@ async def charge_payment(order: dict, payment_id: str) -> dict:
         raise
 
 @activity.defn
+@heartbeating
+@idempotent
 async def mark_order_shipped(order: dict) -> str:
     try:
         result = await stubs.order_shipped(order)
@@ -46,13 +56,11 @@ async def mark_order_shipped(order: dict) -> str:
 
 @activity.defn
 async def set_order_state(order_id: str, state: str) -> None:
-    await store.update_order_state(order_id, state)
-    await store.append_event(order_id, f"state_{state}", {})
+    await store.update_order_state_with_event(order_id, state, f"state_{state}", {})
 
 @activity.defn
 async def update_order_address(order_id: str, address: dict) -> None:
-    await store.update_address(order_id, address)
-    await store.append_event(order_id, "address_updated", {"address": address})
+    await store.update_address_with_event(order_id, address, "address_updated", {"address": address})
 
 @activity.defn
 async def append_event(order_id: str, type_: str, payload: dict | None = None) -> None:
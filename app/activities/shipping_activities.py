@@ -1,10 +1,14 @@
 from temporalio import activity
 import structlog
+from app.activities.heartbeat import heartbeating
+from app.activities.idempotency import idempotent
 from app.domain import stubs
 
 log = structlog.get_logger()
 
 @activity.defn
+@heartbeating
+@idempotent
 async def prepare_package(order: dict) -> str:
     try:
         result = await stubs.package_prepared(order)
@@ -15,6 +19,8 @@ async def prepare_package(order: dict) -> str:
         raise
 
 @activity.defn
+@heartbeating
+@idempotent
 async def dispatch_carrier(order: dict) -> str:
     try:
         result = await stubs.carrier_dispatched(order)
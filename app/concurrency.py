@@ -0,0 +1,24 @@
+import asyncio
+from typing import Awaitable, Callable, Sequence, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+async def bounded_map(fn: Callable[[T], Awaitable[R]], items: Sequence[T], limit: int) -> list[R]:
+    """Apply `fn` to every item with at most `limit` calls in flight; results keep input order.
+
+    Runs a fixed pool of `limit` workers instead of one task per item, so a
+    batch of thousands doesn't create thousands of tasks. `fn` must not raise.
+    """
+    results: list[R | None] = [None] * len(items)
+    next_index = 0
+
+    async def worker() -> None:
+        nonlocal next_index
+        while next_index < len(items):
+            i = next_index
+            next_index += 1
+            results[i] = await fn(items[i])
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(limit, len(items))))))
+    return results  # type: ignore[return-value]
@@ -1,4 +1,5 @@
 import os
+from dataclasses import dataclass
 from datetime import timedelta
 from temporalio.common import RetryPolicy
 
@@ -11,16 +12,216 @@ RUN_TIMEOUT_SECS = int(os.getenv("RUN_TIMEOUT_SECS", "15"))
 CHILD_RUN_TIMEOUT_SECS = int(os.getenv("CHILD_RUN_TIMEOUT_SECS", "8"))
 MANUAL_REVIEW_SECS = int(os.getenv("MANUAL_REVIEW_SECS", "2"))
 
-# Activity options to be used at workflow call sites
-ACTIVITY_KWARGS = dict(
-    start_to_close_timeout=timedelta(seconds=3),
+# Per-activity timeout/retry profiles, looked up by activity name at workflow call sites via
+# activity_options(). call_timeout bounds the downstream call inside the activity (app.activities.heartbeat),
+# so a hung call fails in under a second instead of burning the whole start_to_close timeout; the
+# heartbeat timeout lets the server notice a dead worker just as fast.
+ACTIVITY_CALL_TIMEOUT_MS = int(os.getenv("ACTIVITY_CALL_TIMEOUT_MS", "800"))
+ACTIVITY_HEARTBEAT_TIMEOUT_MS = int(os.getenv("ACTIVITY_HEARTBEAT_TIMEOUT_MS", "600"))
+PAYMENT_CALL_TIMEOUT_MS = int(os.getenv("PAYMENT_CALL_TIMEOUT_MS", "2000"))
+
+
+@dataclass(frozen=True)
+class ActivityProfile:
+    start_to_close: timedelta
+    schedule_to_close: timedelta
+    retry_policy: RetryPolicy
+    heartbeat: timedelta | None = None
+    call_timeout: timedelta | None = None
+
+    def kwargs(self) -> dict:
+        kwargs = dict(
+            start_to_close_timeout=self.start_to_close,
+            schedule_to_close_timeout=self.schedule_to_close,
+            retry_policy=self.retry_policy,
+        )
+        if self.heartbeat is not None:
+            kwargs["heartbeat_timeout"] = self.heartbeat
+        return kwargs
+
+
+ACTIVITY_PROFILES = {
+    # Downstream calls (stubs today, carrier/inventory services later)
+    "downstream": ActivityProfile(
+        start_to_close=timedelta(seconds=3),
+        schedule_to_close=timedelta(seconds=6),
+        heartbeat=timedelta(milliseconds=ACTIVITY_HEARTBEAT_TIMEOUT_MS),
+        call_timeout=timedelta(milliseconds=ACTIVITY_CALL_TIMEOUT_MS),
+        retry_policy=RetryPolicy(
+            maximum_attempts=5,
+            initial_interval=timedelta(milliseconds=200),
+            backoff_coefficient=2.0,
+            maximum_interval=timedelta(seconds=2),
+        ),
+    ),
+    # Payment providers are slower to answer; allow a longer call but fewer, wider-spaced attempts
+    "payment": ActivityProfile(
+        start_to_close=timedelta(seconds=5),
+        schedule_to_close=timedelta(seconds=12),
+        heartbeat=timedelta(milliseconds=ACTIVITY_HEARTBEAT_TIMEOUT_MS),
+        call_timeout=timedelta(milliseconds=PAYMENT_CALL_TIMEOUT_MS),
+        retry_policy=RetryPolicy(
+            maximum_attempts=4,
+            initial_interval=timedelta(milliseconds=500),
+            backoff_coefficient=2.0,
+            maximum_interval=timedelta(seconds=3),
+        ),
+    ),
+    # Single-statement DB writes: no downstream call to guard, quick retries
+    "bookkeeping": ActivityProfile(
+        start_to_close=timedelta(seconds=2),
+        schedule_to_close=timedelta(seconds=6),
+        retry_policy=RetryPolicy(
+            maximum_attempts=5,
+            initial_interval=timedelta(milliseconds=100),
+            backoff_coefficient=2.0,
+            maximum_interval=timedelta(seconds=1),
+        ),
+    ),
+}
+ACTIVITY_PROFILE_BY_NAME = {
+    "charge_payment": "payment",
+    "set_order_state": "bookkeeping",
+    "update_order_address": "bookkeeping",
+    "append_event": "bookkeeping",
+}
+
+
+def activity_profile(name: str) -> ActivityProfile:
+    return ACTIVITY_PROFILES[ACTIVITY_PROFILE_BY_NAME.get(name, "downstream")]
+
+
+def activity_options(name: str) -> dict:
+    """Keyword arguments for workflow.execute_activity/start_activity of activity `name`."""
+    return activity_profile(name).kwargs()
+
+
+# Hedged downstream calls (app.domain.hedging): comma-separated stub names, e.g.
+# "package_prepared,carrier_dispatched,payment_charged". Off by default. The second call starts after
+# the HEDGE_PERCENTILE latency of the last HEDGE_WINDOW calls, clamped to [min, max]; keep the max
+# below ACTIVITY_CALL_TIMEOUT_MS so the hedge gets a chance before the attempt is failed.
+HEDGE_CALLS = os.getenv("HEDGE_CALLS", "")
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "95"))
+HEDGE_INITIAL_DELAY_MS = int(os.getenv("HEDGE_INITIAL_DELAY_MS", "200"))
+HEDGE_MIN_DELAY_MS = int(os.getenv("HEDGE_MIN_DELAY_MS", "20"))
+HEDGE_MAX_DELAY_MS = int(os.getenv("HEDGE_MAX_DELAY_MS", "400"))
+HEDGE_WINDOW = int(os.getenv("HEDGE_WINDOW", "200"))
+
+# Per-process circuit breaker per downstream dependency (app.domain.breaker). 0 disables.
+BREAKER_FAILURE_THRESHOLD = int(os.getenv("BREAKER_FAILURE_THRESHOLD", "0"))  # 0 = breakers off
+BREAKER_RESET_SECS = float(os.getenv("BREAKER_RESET_SECS", "2"))
+BREAKER_HALF_OPEN_CALLS = int(os.getenv("BREAKER_HALF_OPEN_CALLS", "1"))
+
+# Bookkeeping writes (set_order_state, update_order_address, append_event): "remote" schedules them on
+# orders-tq like any activity, "local" runs them as local activities inside the workflow task.
+# The API passes the mode in the workflow input so in-flight orders keep the mode they started with.
+BOOKKEEPING_MODE = os.getenv("BOOKKEEPING_MODE", "remote")
+# Shipping per attempt: "child" starts a ShippingWorkflow on shipping-tq (scales separately); "inline" runs
+# prepare_package/dispatch_carrier as activities of OrderWorkflow on orders-tq. Passed in the workflow input.
+SHIPPING_MODE = os.getenv("SHIPPING_MODE", "child")
+# update_address signals within this window are written once, with the latest address
+ADDRESS_DEBOUNCE_MS = int(os.getenv("ADDRESS_DEBOUNCE_MS", "1000"))
+LOCAL_ACTIVITY_KWARGS = dict(
+    start_to_close_timeout=timedelta(seconds=2),
     schedule_to_close_timeout=timedelta(seconds=6),
+    # Backoffs up to this run in-process; longer ones become a durable timer
+    local_retry_threshold=timedelta(seconds=1),
     retry_policy=RetryPolicy(
         maximum_attempts=5,
-        initial_interval=timedelta(milliseconds=200),
+        initial_interval=timedelta(milliseconds=50),
         backoff_coefficient=2.0,
-        maximum_interval=timedelta(seconds=2),
+        maximum_interval=timedelta(seconds=1),
     ),
 )
 
 
+
+# Database connection pooling. DB_POOL_SIZE=0 keeps a NullPool (one connection per statement).
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "0"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT_SECS = float(os.getenv("DB_POOL_TIMEOUT_SECS", "5"))
+DB_POOL_RECYCLE_SECS = int(os.getenv("DB_POOL_RECYCLE_SECS", "1800"))
+DB_POOL_WARMUP = int(os.getenv("DB_POOL_WARMUP", str(DB_POOL_SIZE)))
+DB_STATEMENT_CACHE_SIZE = int(os.getenv("DB_STATEMENT_CACHE_SIZE", "256"))
+
+# Optional read replica for status/listing reads (same pool settings as the primary). Reads go
+# back to the primary while the replica is more than DB_REPLICA_MAX_LAG_SECS behind or unreachable;
+# lag is re-checked at most every DB_REPLICA_LAG_CHECK_SECS.
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL", "")
+DB_REPLICA_MAX_LAG_SECS = float(os.getenv("DB_REPLICA_MAX_LAG_SECS", "2"))
+DB_REPLICA_LAG_CHECK_SECS = float(os.getenv("DB_REPLICA_LAG_CHECK_SECS", "1"))
+
+# Event writes: "direct" inserts one row per append_event; "batched" buffers them per process
+EVENT_WRITER_MODE = os.getenv("EVENT_WRITER_MODE", "direct")
+EVENT_WRITER_MAX_BATCH = int(os.getenv("EVENT_WRITER_MAX_BATCH", "500"))
+EVENT_WRITER_MAX_DELAY_MS = int(os.getenv("EVENT_WRITER_MAX_DELAY_MS", "50"))
+# Hold activity completion until its buffered events are committed
+EVENT_WRITER_FLUSH_ON_COMPLETE = os.getenv("EVENT_WRITER_FLUSH_ON_COMPLETE", "1") == "1"
+
+# /status read-model cache; 0 disables it
+STATUS_CACHE_TTL_MS = int(os.getenv("STATUS_CACHE_TTL_MS", "0"))
+STATUS_CACHE_MAX_ENTRIES = int(os.getenv("STATUS_CACHE_MAX_ENTRIES", "10000"))
+
+# Bulk endpoints: max items per request and concurrent Temporal calls per request
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "5000"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "64"))
+# Upsert the OrderStep search attribute on every step change (register it on the namespace first)
+# so bulk signals can select orders by step. Costs one history event per step, hence opt-in.
+ORDER_STEP_SEARCH_ATTRIBUTE = os.getenv("ORDER_STEP_SEARCH_ATTRIBUTE", "0") == "1"
+
+# Prometheus: app metrics on METRICS_PORT (workers) or /metrics (API); Temporal SDK metrics on TEMPORAL_METRICS_PORT. 0 disables.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+TEMPORAL_METRICS_PORT = int(os.getenv("TEMPORAL_METRICS_PORT", "0"))
+
+# Worker tuning. Activities here are async and IO-bound, so slots scale well past the core count.
+CPU_COUNT = os.cpu_count() or 1
+WORKER_MAX_CONCURRENT_ACTIVITIES = int(os.getenv("WORKER_MAX_CONCURRENT_ACTIVITIES", str(CPU_COUNT * 50)))
+WORKER_MAX_CONCURRENT_LOCAL_ACTIVITIES = int(os.getenv("WORKER_MAX_CONCURRENT_LOCAL_ACTIVITIES", str(CPU_COUNT * 50)))
+WORKER_MAX_CONCURRENT_WORKFLOW_TASKS = int(os.getenv("WORKER_MAX_CONCURRENT_WORKFLOW_TASKS", str(max(4, CPU_COUNT * 4))))
+WORKER_WORKFLOW_TASK_POLLERS = int(os.getenv("WORKER_WORKFLOW_TASK_POLLERS", str(min(16, max(2, CPU_COUNT)))))
+WORKER_ACTIVITY_TASK_POLLERS = int(os.getenv("WORKER_ACTIVITY_TASK_POLLERS", str(min(16, max(2, CPU_COUNT)))))
+WORKER_MAX_CACHED_WORKFLOWS = int(os.getenv("WORKER_MAX_CACHED_WORKFLOWS", "1000"))
+# Thread pool for sync activities; 0 = none (every activity is async today)
+WORKER_ACTIVITY_EXECUTOR_THREADS = int(os.getenv("WORKER_ACTIVITY_EXECUTOR_THREADS", "0"))
+# "fixed" uses the limits above; "resource" sizes slots from observed CPU/memory, capped by them
+WORKER_TUNER = os.getenv("WORKER_TUNER", "fixed")
+WORKER_TUNER_TARGET_CPU = float(os.getenv("WORKER_TUNER_TARGET_CPU", "0.8"))
+WORKER_TUNER_TARGET_MEMORY = float(os.getenv("WORKER_TUNER_TARGET_MEMORY", "0.8"))
+
+# How long a stopping worker waits for in-flight activities; processes per worker type under the supervisor
+WORKER_GRACEFUL_SHUTDOWN_SECS = int(os.getenv("WORKER_GRACEFUL_SHUTDOWN_SECS", "10"))
+WORKER_PROCS = int(os.getenv("WORKER_PROCS", str(CPU_COUNT)))
+
+# Events partitions (python -m app.maintenance): daily partitions created this many days ahead, kept for
+# EVENTS_RETENTION_DAYS, then detached and, when EVENTS_ARCHIVE_DIR is set, written there as .csv.gz and dropped.
+EVENTS_PARTITION_PREMAKE_DAYS = int(os.getenv("EVENTS_PARTITION_PREMAKE_DAYS", "7"))
+EVENTS_RETENTION_DAYS = int(os.getenv("EVENTS_RETENTION_DAYS", "30"))
+EVENTS_ARCHIVE_DIR = os.getenv("EVENTS_ARCHIVE_DIR", "")
+# Recent-events reads only look this far back, so they scan the newest partitions only
+EVENTS_RECENT_LOOKBACK_DAYS = int(os.getenv("EVENTS_RECENT_LOOKBACK_DAYS", "7"))
+
+# Event feed: store.* NOTIFYs this channel on every event insert; the API LISTENs and pushes over SSE
+EVENTS_NOTIFY_CHANNEL = os.getenv("EVENTS_NOTIFY_CHANNEL", "order_events")
+EVENTS_PAGE_MAX = int(os.getenv("EVENTS_PAGE_MAX", "1000"))
+ORDERS_PAGE_MAX = int(os.getenv("ORDERS_PAGE_MAX", "1000"))
+EVENT_STREAM_HEARTBEAT_SECS = float(os.getenv("EVENT_STREAM_HEARTBEAT_SECS", "15"))
+# Event ids come from a sequence at INSERT, so a lower id can commit after a higher one was streamed.
+# The stream re-reads events inserted within this window and sends the ones it hasn't sent yet.
+EVENT_STREAM_REORDER_WINDOW_SECS = float(os.getenv("EVENT_STREAM_REORDER_WINDOW_SECS", "10"))
+
+# Payloads: "orjson" swaps the json/plain serializer; payloads of at least PAYLOAD_COMPRESS_MIN_BYTES are
+# zlib-compressed (0 = off). Use the same values on the API and every worker. See app/converter.py.
+PAYLOAD_CONVERTER = os.getenv("PAYLOAD_CONVERTER", "json")
+PAYLOAD_COMPRESS_MIN_BYTES = int(os.getenv("PAYLOAD_COMPRESS_MIN_BYTES", "0"))
+PAYLOAD_COMPRESS_LEVEL = int(os.getenv("PAYLOAD_COMPRESS_LEVEL", "6"))
+# Largest payload a zlib payload may expand to when decoded; guards the public /codec/decode endpoint
+PAYLOAD_DECOMPRESS_MAX_BYTES = int(os.getenv("PAYLOAD_DECOMPRESS_MAX_BYTES", str(16 * 1024 * 1024)))
+# Browser origins allowed to call the API's /codec endpoints (Temporal UI codec server)
+CODEC_CORS_ORIGINS = [o for o in os.getenv("CODEC_CORS_ORIGINS", "http://localhost:8233").split(",") if o]
+
+# Logging: records go through a queue to a background thread that writes stdout (LOG_ASYNC=0 writes inline).
+# LOG_SAMPLE_RATES keeps a fraction of info-level events by name, e.g. "activity_receive_order=0.1,activity_*=0.25"
+# (a trailing * matches a prefix). Warnings and errors are always kept.
+LOG_ASYNC = os.getenv("LOG_ASYNC", "1") == "1"
+LOG_RENDERER = os.getenv("LOG_RENDERER", "orjson")
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
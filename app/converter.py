@@ -0,0 +1,185 @@
+"""Opt-in compact data converter: orjson for json/plain payloads and zlib above a size threshold.
+
+The orjson converter still writes ordinary `json/plain` payloads, so it mixes
+freely with default clients. Compressed payloads (`binary/zlib`) can only be
+read by clients that have the codec, so the API and all workers must share the
+same PAYLOAD_* settings.
+
+Tooling: the API serves a codec endpoint at /codec (Temporal UI "Codec Server",
+`temporal workflow show --codec-endpoint http://localhost:8000/codec`), and
+
+    python -m app.converter history <workflow_id>
+
+prints a workflow's history with payloads decoded.
+"""
+import argparse, asyncio, dataclasses, json, sys, zlib
+from typing import Any, Iterator, Sequence
+import orjson
+from google.protobuf.json_format import MessageToDict
+from google.protobuf.message import DecodeError, Message
+from temporalio.api.common.v1 import Payload
+from temporalio.api.enums.v1 import EventType
+from temporalio.client import Client
+from temporalio.converter import (
+    AdvancedJSONEncoder, CompositePayloadConverter, DataConverter, DefaultPayloadConverter,
+    JSONPlainPayloadConverter, PayloadCodec, value_to_type,
+)
+
+import app.config as config
+
+ZLIB_ENCODING = b"binary/zlib"
+
+
+class CodecError(ValueError):
+    """A payload the codec can't decode: corrupt zlib data or not a serialized Payload."""
+
+
+class PayloadTooLarge(CodecError):
+    pass
+
+
+class OrjsonPlainPayloadConverter(JSONPlainPayloadConverter):
+    """`json/plain` via orjson; types orjson can't handle fall back to the SDK's encoder."""
+
+    _fallback = AdvancedJSONEncoder()
+
+    def to_payload(self, value: Any) -> Payload | None:
+        return Payload(
+            metadata={"encoding": self.encoding.encode()},
+            data=orjson.dumps(value, default=self._fallback.default),
+        )
+
+    def from_payload(self, payload: Payload, type_hint: type | None = None) -> Any:
+        try:
+            obj = orjson.loads(payload.data)
+        except orjson.JSONDecodeError as err:
+            raise RuntimeError("Failed parsing") from err
+        return value_to_type(type_hint, obj, self._custom_type_converters) if type_hint else obj
+
+
+class CompactPayloadConverter(CompositePayloadConverter):
+    def __init__(self) -> None:
+        converters = [
+            OrjsonPlainPayloadConverter() if isinstance(c, JSONPlainPayloadConverter) else c
+            for c in DefaultPayloadConverter.default_encoding_payload_converters
+        ]
+        super().__init__(*converters)
+
+
+class CompressionCodec(PayloadCodec):
+    """Wraps payloads of at least `min_bytes` serialized bytes in a zlib payload, when that is smaller.
+
+    Decoding stops at `max_decompressed_bytes`, so a small hostile payload can't expand without bound.
+    """
+
+    def __init__(self, min_bytes: int, level: int = 6, max_decompressed_bytes: int | None = None) -> None:
+        self.min_bytes = min_bytes
+        self.level = level
+        self.max_decompressed_bytes = (
+            config.PAYLOAD_DECOMPRESS_MAX_BYTES if max_decompressed_bytes is None else max_decompressed_bytes
+        )
+
+    def _encode_one(self, p: Payload) -> Payload:
+        if self.min_bytes <= 0 or p.metadata.get("encoding") == ZLIB_ENCODING:
+            return p
+        raw = p.SerializeToString()
+        if len(raw) < self.min_bytes:
+            return p
+        packed = zlib.compress(raw, self.level)
+        if len(packed) >= len(raw):
+            return p
+        return Payload(metadata={"encoding": ZLIB_ENCODING}, data=packed)
+
+    async def encode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [self._encode_one(p) for p in payloads]
+
+    def _decode_one(self, p: Payload) -> Payload:
+        if p.metadata.get("encoding") != ZLIB_ENCODING:
+            return p
+        inflater = zlib.decompressobj()
+        try:
+            raw = inflater.decompress(p.data, self.max_decompressed_bytes)
+            if inflater.unconsumed_tail:
+                raise PayloadTooLarge(f"payload expands past {self.max_decompressed_bytes} bytes")
+            if not inflater.eof:
+                raise CodecError("truncated zlib payload")
+            return Payload.FromString(raw)
+        except (zlib.error, DecodeError) as e:
+            raise CodecError(f"corrupt zlib payload: {e}") from e
+
+    async def decode(self, payloads: Sequence[Payload]) -> list[Payload]:
+        return [self._decode_one(p) for p in payloads]
+
+
+def data_converter(converter: str | None = None, compress_min_bytes: int | None = None) -> DataConverter:
+    """DataConverter for Client.connect / test environments, from PAYLOAD_* config unless overridden."""
+    converter = config.PAYLOAD_CONVERTER if converter is None else converter
+    min_bytes = config.PAYLOAD_COMPRESS_MIN_BYTES if compress_min_bytes is None else compress_min_bytes
+    if converter == "json" and min_bytes <= 0:
+        return DataConverter.default
+    return dataclasses.replace(
+        DataConverter.default,
+        payload_converter_class=CompactPayloadConverter if converter == "orjson" else DefaultPayloadConverter,
+        payload_codec=CompressionCodec(min_bytes, config.PAYLOAD_COMPRESS_LEVEL),
+    )
+
+
+def codec() -> PayloadCodec:
+    """Codec for the /codec endpoints; always able to decode, encodes per config."""
+    return CompressionCodec(config.PAYLOAD_COMPRESS_MIN_BYTES, config.PAYLOAD_COMPRESS_LEVEL)
+
+
+def iter_payloads(message: Message) -> Iterator[Payload]:
+    """Every Payload nested anywhere in a proto message (history events, headers, failures)."""
+    if isinstance(message, Payload):
+        yield message
+        return
+    for field, value in message.ListFields():
+        if field.message_type is None:
+            continue
+        if isinstance(value, Message):
+            yield from iter_payloads(value)
+            continue
+        # repeated message field, or a map (whose values may be scalars)
+        items = value.values() if field.message_type.GetOptions().map_entry else value
+        for v in items:
+            if isinstance(v, Message):
+                yield from iter_payloads(v)
+
+
+async def decode_in_place(message: Message, payload_codec: PayloadCodec) -> None:
+    payloads = list(iter_payloads(message))
+    for target, decoded in zip(payloads, await payload_codec.decode(payloads)):
+        if decoded is not target:
+            target.CopyFrom(decoded)
+
+
+def _readable(payload: Payload) -> Any:
+    if payload.metadata.get("encoding") == b"json/plain":
+        return orjson.loads(payload.data)
+    return MessageToDict(payload)
+
+
+async def _print_history(workflow_id: str, target: str) -> None:
+    client = await Client.connect(target)
+    history = await client.get_workflow_handle(workflow_id).fetch_history()
+    payload_codec = codec()
+    for event in history.events:
+        await decode_in_place(event, payload_codec)
+        values = [_readable(p) for p in iter_payloads(event)]
+        row = {"event_id": event.event_id, "type": EventType.Name(event.event_type), "payloads": values}
+        sys.stdout.write(json.dumps(row, default=str) + "\n")
+
+
+def main(argv: list[str] | None = None) -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = p.add_subparsers(dest="cmd", required=True)
+    h = sub.add_parser("history", help="print a workflow history with payloads decoded, one event per line")
+    h.add_argument("workflow_id")
+    h.add_argument("--target", default=config.TEMPORAL_TARGET)
+    args = p.parse_args(argv)
+    asyncio.run(_print_history(args.workflow_id, args.target))
+
+
+if __name__ == "__main__":
+    main()
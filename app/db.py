@@ -1,51 +1,257 @@
-from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
 from sqlalchemy.pool import NullPool
 from sqlalchemy import text
-from typing import Any
-import json
+from sqlalchemy.sql.elements import TextClause
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncIterator, Awaitable, Callable
+import asyncio, json, time
+import structlog
 import app.config as config
 
 _engine: AsyncEngine | None = None
+_autocommit_engine: AsyncEngine | None = None
 _sessionmaker: async_sessionmaker[AsyncSession] | None = None
+_replica_engine: AsyncEngine | None = None
+_replica_autocommit_engine: AsyncEngine | None = None
 
-def get_engine() -> AsyncEngine:
-    global _engine, _sessionmaker
-    if _engine is None:
-        _engine = create_async_engine(
-            config.DATABASE_URL,
+class PoolStats:
+    """Checkout bookkeeping that works the same for NullPool and QueuePool."""
+
+    def __init__(self) -> None:
+        self.in_use = 0
+        self.connecting = 0  # checkouts in progress: waiting on the pool or opening a connection
+        self.checkouts = 0
+        self.checkout_secs_total = 0.0
+        self.checkout_secs_max = 0.0
+
+    def record_checkout(self, secs: float) -> None:
+        self.checkouts += 1
+        self.checkout_secs_total += secs
+        self.checkout_secs_max = max(self.checkout_secs_max, secs)
+
+_stats = PoolStats()
+_replica_stats = PoolStats()
+
+# Seconds behind the primary, or NULL (treated as unknown: reads go to the primary) when the WAL
+# receiver isn't streaming, e.g. the replica lost its connection. 0 when it has replayed all it received
+# (an idle primary sends nothing, so pg_last_xact_replay_timestamp alone would show ever-growing lag).
+_REPLICA_LAG_SQL = """
+SELECT CASE
+  WHEN NOT pg_is_in_recovery() THEN 0
+  WHEN NOT EXISTS (SELECT 1 FROM pg_stat_wal_receiver WHERE status = 'streaming') THEN NULL
+  WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0
+  ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0)
+END AS lag_secs
+"""
+
+class ReplicaLagGuard:
+    """Cached replica lag; reads use the replica only while the last check was within the threshold.
+
+    One caller re-checks when the value is older than `check_interval_secs`; the
+    rest keep routing on the cached value meanwhile. A failed check, or a replica
+    whose WAL receiver isn't streaming, counts as unknown lag, which sends reads
+    to the primary until a later check succeeds.
+    """
+
+    def __init__(self, max_lag_secs: float, check_interval_secs: float) -> None:
+        self.max_lag_secs = max_lag_secs
+        self.check_interval_secs = check_interval_secs
+        self.lag_secs: float | None = None
+        self.checked_at: float | None = None
+        self.fallbacks = 0
+        self._checking = False
+
+    async def _check(self, probe: Callable[[], Awaitable[float | None]]) -> None:
+        self._checking = True
+        try:
+            lag = await asyncio.wait_for(probe(), config.DB_POOL_TIMEOUT_SECS)
+            self.lag_secs = None if lag is None else float(lag)
+            if lag is None:
+                structlog.get_logger().warning("db_replica_not_streaming")
+        except Exception as e:
+            self.lag_secs = None
+            structlog.get_logger().warning("db_replica_lag_check_failed", error=str(e))
+        finally:
+            self.checked_at = time.monotonic()
+            self._checking = False
+
+    async def use_replica(self, probe: Callable[[], Awaitable[float | None]]) -> bool:
+        stale = self.checked_at is None or time.monotonic() - self.checked_at >= self.check_interval_secs
+        if stale and not self._checking:
+            await self._check(probe)
+        ok = self.lag_secs is not None and self.lag_secs <= self.max_lag_secs
+        if not ok:
+            self.fallbacks += 1
+        return ok
+
+_lag_guard = ReplicaLagGuard(config.DB_REPLICA_MAX_LAG_SECS, config.DB_REPLICA_LAG_CHECK_SECS)
+
+def _engine_kwargs() -> dict[str, Any]:
+    # asyncpg keeps a per-connection prepared statement cache; it only pays off
+    # when connections outlive a single statement, i.e. in pooled mode.
+    kwargs: dict[str, Any] = {
+        "connect_args": {"prepared_statement_cache_size": config.DB_STATEMENT_CACHE_SIZE},
+    }
+    if config.DB_POOL_SIZE <= 0:
+        kwargs.update(pool_pre_ping=False, poolclass=NullPool)
+    else:
+        kwargs.update(
+            pool_size=config.DB_POOL_SIZE,
+            max_overflow=config.DB_MAX_OVERFLOW,
+            pool_timeout=config.DB_POOL_TIMEOUT_SECS,
+            pool_recycle=config.DB_POOL_RECYCLE_SECS,
             pool_pre_ping=False,
-            poolclass=NullPool,
         )
+    return kwargs
+
+def get_engine() -> AsyncEngine:
+    global _engine, _autocommit_engine, _sessionmaker
+    if _engine is None:
+        _engine = create_async_engine(config.DATABASE_URL, **_engine_kwargs())
+        # Every store.* call is a single statement, so run them in autocommit and
+        # skip the BEGIN/COMMIT round trips. Shares the pool with _engine.
+        _autocommit_engine = _engine.execution_options(isolation_level="AUTOCOMMIT")
         _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
     return _engine
 
+def get_replica_engine() -> AsyncEngine | None:
+    """Engine for DATABASE_REPLICA_URL, or None when no replica is configured."""
+    global _replica_engine, _replica_autocommit_engine
+    if _replica_engine is None and config.DATABASE_REPLICA_URL:
+        _replica_engine = create_async_engine(config.DATABASE_REPLICA_URL, **_engine_kwargs())
+        _replica_autocommit_engine = _replica_engine.execution_options(isolation_level="AUTOCOMMIT")
+    return _replica_engine
+
 def get_sessionmaker() -> async_sessionmaker[AsyncSession]:
     if _sessionmaker is None:
         get_engine()
     assert _sessionmaker is not None
     return _sessionmaker
 
+@lru_cache(maxsize=512)
+def _text(sql: str) -> TextClause:
+    # store.* passes the same literal SQL every call; reuse the TextClause so
+    # SQLAlchemy's compiled cache (and asyncpg's statement cache) get hits.
+    return text(sql)
+
+@asynccontextmanager
+async def connect(replica: bool = False) -> AsyncIterator[AsyncConnection]:
+    """Check out an autocommit Core connection, skipping the ORM session machinery."""
+    if replica and get_replica_engine() is not None:
+        assert _replica_autocommit_engine is not None
+        engine, stats = _replica_autocommit_engine, _replica_stats
+    else:
+        get_engine()
+        assert _autocommit_engine is not None
+        engine, stats = _autocommit_engine, _stats
+    stats.connecting += 1
+    started = time.perf_counter()
+    try:
+        conn = await engine.connect()
+    finally:
+        stats.connecting -= 1
+    stats.record_checkout(time.perf_counter() - started)
+    stats.in_use += 1
+    try:
+        yield conn
+    finally:
+        stats.in_use -= 1
+        await conn.close()
+
+async def _replica_lag() -> float | None:
+    async with connect(replica=True) as conn:
+        return (await conn.execute(_text(_REPLICA_LAG_SQL))).scalar_one()
+
+async def _read_from_replica(primary: bool) -> bool:
+    if primary or not config.DATABASE_REPLICA_URL:
+        return False
+    return await _lag_guard.use_replica(_replica_lag)
+
 async def execute(sql: str, params: dict | None = None) -> None:
-    sm = get_sessionmaker()
-    async with sm() as sess:
-        await sess.execute(text(sql), params or {})
-        await sess.commit()
-
-async def fetchone(sql: str, params: dict | None = None) -> dict | None:
-    sm = get_sessionmaker()
-    async with sm() as sess:
-        res = await sess.execute(text(sql), params or {})
+    async with connect() as conn:
+        await conn.execute(_text(sql), params or {})
+
+# Reads go to the replica when one is configured and caught up. Pass primary=True for
+# statements that write (INSERT ... RETURNING) or must see this process's own writes.
+async def fetchone(sql: str, params: dict | None = None, *, primary: bool = False) -> dict | None:
+    async with connect(replica=await _read_from_replica(primary)) as conn:
+        res = await conn.execute(_text(sql), params or {})
         row = res.mappings().first()
         return dict(row) if row else None
 
-async def fetchall(sql: str, params: dict | None = None) -> list[dict[str, Any]]:
-    sm = get_sessionmaker()
-    async with sm() as sess:
-        res = await sess.execute(text(sql), params or {})
+async def fetchall(sql: str, params: dict | None = None, *, primary: bool = False) -> list[dict[str, Any]]:
+    async with connect(replica=await _read_from_replica(primary)) as conn:
+        res = await conn.execute(_text(sql), params or {})
         rows = res.mappings().all()
         return [dict(r) for r in rows]
 
-def json_dumps(obj: Any) -> str:
-    return json.dumps(obj)
+async def warm_up(connections: int | None = None) -> int:
+    """Open up to DB_POOL_SIZE connections per engine up front so the first activities don't pay the handshake.
+
+    Returns how many were opened across the primary and replica pools. If any connect fails, the ones
+    that did open are returned to the pool and the first error is raised.
+    """
+    n = min(config.DB_POOL_WARMUP if connections is None else connections, config.DB_POOL_SIZE)
+    if n <= 0:
+        return 0
+    engines = [e for e in (get_engine(), get_replica_engine()) if e is not None]
+    results = await asyncio.gather(*(e.connect() for e in engines for _ in range(n)), return_exceptions=True)
+    conns = [r for r in results if not isinstance(r, BaseException)]
+    try:
+        for r in results:
+            if isinstance(r, BaseException):
+                raise r
+        await asyncio.gather(*(c.exec_driver_sql("SELECT 1") for c in conns))
+    finally:
+        await asyncio.gather(*(c.close() for c in conns), return_exceptions=True)
+    return len(conns)
+
+def replica_lag() -> float | None:
+    return _lag_guard.lag_secs
+
+def _pool_stats(pool: Any, stats: PoolStats) -> dict[str, Any]:
+    checkouts = stats.checkouts
+    out: dict[str, Any] = {
+        "mode": "queue" if config.DB_POOL_SIZE > 0 else "null",
+        "in_use": stats.in_use,
+        "connecting": stats.connecting,
+        "checkouts": checkouts,
+        "checkout_ms_avg": round(stats.checkout_secs_total / checkouts * 1000, 3) if checkouts else 0.0,
+        "checkout_ms_max": round(stats.checkout_secs_max * 1000, 3),
+    }
+    if config.DB_POOL_SIZE > 0:
+        out.update(
+            size=pool.size(),
+            idle=pool.checkedin(),
+            overflow=pool.overflow(),
+            max_overflow=config.DB_MAX_OVERFLOW,
+        )
+    return out
+
+def pool_stats() -> dict[str, Any]:
+    stats = _pool_stats(get_engine().pool, _stats)
+    replica = get_replica_engine()
+    if replica is not None:
+        stats["replica"] = {
+            **_pool_stats(replica.pool, _replica_stats),
+            "lag_secs": _lag_guard.lag_secs,
+            "max_lag_secs": _lag_guard.max_lag_secs,
+            "fallbacks_to_primary": _lag_guard.fallbacks,
+        }
+    return stats
 
+async def dispose() -> None:
+    global _engine, _autocommit_engine, _sessionmaker, _replica_engine, _replica_autocommit_engine
+    if _engine is not None:
+        await _engine.dispose()
+    if _replica_engine is not None:
+        await _replica_engine.dispose()
+    _engine = None
+    _autocommit_engine = None
+    _sessionmaker = None
+    _replica_engine = None
+    _replica_autocommit_engine = None
 
+def json_dumps(obj: Any) -> str:
+    return json.dumps(obj)
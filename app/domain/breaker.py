@@ -0,0 +1,130 @@
+"""Per-process circuit breakers for downstream dependencies.
+
+closed: calls go through; BREAKER_FAILURE_THRESHOLD consecutive failures open it.
+open: calls fail at once with CircuitOpenError (retry_after = time until half-open)
+instead of tying up an activity slot until the call times out.
+half-open: after BREAKER_RESET_SECS up to BREAKER_HALF_OPEN_CALLS trial calls go
+through; a success closes the breaker, a failure opens it again.
+"""
+import asyncio, time
+from typing import Any, Awaitable, Callable, TypeVar
+import structlog
+
+import app.config as config
+from app.metrics import BREAKER_REJECTED, BREAKER_STATE
+
+T = TypeVar("T")
+log = structlog.get_logger()
+
+CLOSED, HALF_OPEN, OPEN = "closed", "half_open", "open"
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+
+class CircuitOpenError(Exception):
+    def __init__(self, dependency: str, retry_after: float) -> None:
+        super().__init__(f"circuit open for {dependency}; retry in {retry_after:.2f}s")
+        self.dependency = dependency
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    def __init__(self, dependency: str, failure_threshold: int, reset_secs: float, half_open_calls: int = 1,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.dependency = dependency
+        self.failure_threshold = failure_threshold
+        self.reset_secs = reset_secs
+        self.half_open_calls = half_open_calls
+        self._clock = clock
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.trials = 0
+        self.rejected = 0
+        self.opened = 0
+        BREAKER_STATE.labels(dependency).set(_STATE_VALUES[CLOSED])
+
+    def _set_state(self, state: str) -> None:
+        if state == self.state:
+            return
+        log.warning("circuit_state_changed", dependency=self.dependency, old=self.state, new=state,
+                    failures=self.failures)
+        self.state = state
+        BREAKER_STATE.labels(self.dependency).set(_STATE_VALUES[state])
+
+    def _reject(self, retry_after: float) -> CircuitOpenError:
+        self.rejected += 1
+        BREAKER_REJECTED.labels(self.dependency).inc()
+        return CircuitOpenError(self.dependency, retry_after)
+
+    def _before_call(self) -> None:
+        if self.state == OPEN:
+            remaining = self.opened_at + self.reset_secs - self._clock()
+            if remaining > 0:
+                raise self._reject(remaining)
+            self._set_state(HALF_OPEN)
+            self.trials = 0
+        if self.state == HALF_OPEN:
+            if self.trials >= self.half_open_calls:
+                # Trials in flight; come back about when they should have settled
+                raise self._reject(self.reset_secs)
+            self.trials += 1
+
+    def _on_success(self) -> None:
+        self.failures = 0
+        self._set_state(CLOSED)
+
+    def _on_failure(self) -> None:
+        self.failures += 1
+        # A call that started before the breaker opened and fails late must not extend the open period
+        if self.state == HALF_OPEN or (self.state == CLOSED and self.failures >= self.failure_threshold):
+            self.opened_at = self._clock()
+            self.opened += 1
+            self._set_state(OPEN)
+
+    async def call(self, fn: Callable[[], Awaitable[T]]) -> T:
+        self._before_call()
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            # The activity gave up on a hung call (call_timeout): count it, like any other failure
+            self._on_failure()
+            raise
+        except Exception:
+            self._on_failure()
+            raise
+        self._on_success()
+        return result
+
+    def stats(self) -> dict[str, Any]:
+        return {"state": self.state, "failures": self.failures, "opened": self.opened, "rejected": self.rejected}
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+
+
+def get(dependency: str) -> CircuitBreaker | None:
+    """The process-wide breaker for `dependency`, or None when BREAKER_FAILURE_THRESHOLD is 0."""
+    if config.BREAKER_FAILURE_THRESHOLD <= 0:
+        return None
+    breaker = _breakers.get(dependency)
+    if breaker is None:
+        breaker = _breakers[dependency] = CircuitBreaker(
+            dependency,
+            failure_threshold=config.BREAKER_FAILURE_THRESHOLD,
+            reset_secs=config.BREAKER_RESET_SECS,
+            half_open_calls=config.BREAKER_HALF_OPEN_CALLS,
+        )
+    return breaker
+
+
+async def call(dependency: str, fn: Callable[[], Awaitable[T]]) -> T:
+    breaker = get(dependency)
+    return await (fn() if breaker is None else breaker.call(fn))
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    return {name: b.stats() for name, b in sorted(_breakers.items())}
+
+
+def reset() -> None:
+    _breakers.clear()
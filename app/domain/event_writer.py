@@ -0,0 +1,103 @@
+import asyncio
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable
+import structlog
+
+log = structlog.get_logger()
+
+EventRow = tuple[str, str, dict]
+Sink = Callable[[list[EventRow]], Awaitable[None]]
+
+# Set by the activity interceptor; every event submitted while it is set is
+# collected so the activity can wait for exactly its own rows to be durable.
+pending_events: ContextVar[list[asyncio.Future] | None] = ContextVar("pending_events", default=None)
+
+
+def _consume_exception(fut: asyncio.Future) -> None:
+    if not fut.cancelled():
+        fut.exception()
+
+
+class EventWriter:
+    """Per-process buffer that writes events as multi-row INSERTs.
+
+    A batch is flushed when `max_batch` rows are buffered or `max_delay` seconds
+    after the first buffered row, whichever comes first. `submit` returns a
+    future that resolves once the row is committed.
+    """
+
+    def __init__(self, sink: Sink, max_batch: int = 500, max_delay: float = 0.05) -> None:
+        self._sink = sink
+        self._max_batch = max_batch
+        self._max_delay = max_delay
+        self._buffer: list[tuple[EventRow, asyncio.Future]] = []
+        self._has_rows = asyncio.Event()
+        self._flush_now = asyncio.Event()
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        self.batches = 0
+        self.rows = 0
+
+    def submit(self, order_id: str, type_: str, payload: dict) -> asyncio.Future:
+        fut = asyncio.get_running_loop().create_future()
+        fut.add_done_callback(_consume_exception)
+        self._buffer.append(((order_id, type_, payload), fut))
+        pending = pending_events.get()
+        if pending is not None:
+            pending.append(fut)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+        self._has_rows.set()
+        if len(self._buffer) >= self._max_batch:
+            self._flush_now.set()
+        return fut
+
+    async def wait_for(self, futures: list[asyncio.Future]) -> None:
+        """Flush immediately and wait until all `futures` are committed (or raise)."""
+        if not futures:
+            return
+        if any(not f.done() for f in futures):
+            self._flush_now.set()
+        await asyncio.gather(*futures)
+
+    async def flush(self) -> None:
+        async with self._lock:
+            while self._buffer:
+                batch = self._buffer[: self._max_batch]
+                self._buffer = self._buffer[self._max_batch :]
+                try:
+                    await self._sink([row for row, _ in batch])
+                except asyncio.CancelledError:
+                    self._buffer[:0] = batch
+                    raise
+                except Exception as e:
+                    log.error("event_writer_flush_error", rows=len(batch), error=str(e))
+                    for _, fut in batch:
+                        if not fut.done():
+                            fut.set_exception(e)
+                    continue
+                self.batches += 1
+                self.rows += len(batch)
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_result(None)
+
+    async def close(self) -> None:
+        await self.flush()
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def stats(self) -> dict[str, Any]:
+        return {"buffered": len(self._buffer), "batches": self.batches, "rows": self.rows}
+
+    async def _run(self) -> None:
+        while True:
+            await self._has_rows.wait()
+            try:
+                await asyncio.wait_for(self._flush_now.wait(), self._max_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._has_rows.clear()
+            self._flush_now.clear()
+            await self.flush()
@@ -0,0 +1,138 @@
+"""Hedged (speculative) downstream calls.
+
+If a call hasn't finished after the hedge delay, a second identical call is
+started and whichever succeeds first wins; the other is cancelled. The delay
+tracks a percentile (HEDGE_PERCENTILE) of recently observed call latencies, so
+only the slow tail gets a second call. Only for calls that are safe to issue
+twice (idempotent by key, e.g. payments by payment_id).
+"""
+import asyncio, math, time
+from collections import deque
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, TypeVar
+
+import app.config as config
+from app.metrics import HEDGE_DELAY, HEDGE_OUTCOMES
+
+T = TypeVar("T")
+
+
+class Hedger:
+    def __init__(self, name: str, percentile: float, initial_delay: float, min_delay: float,
+                 max_delay: float, window: int, min_samples: int = 20) -> None:
+        self.name = name
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self._latencies: deque[float] = deque(maxlen=window)
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def delay(self) -> float:
+        if len(self._latencies) < self.min_samples:
+            return self.initial_delay
+        s = sorted(self._latencies)
+        observed = s[max(0, math.ceil(self.percentile / 100 * len(s)) - 1)]
+        return min(self.max_delay, max(self.min_delay, observed))
+
+    def _record(self, outcome: str) -> None:
+        HEDGE_OUTCOMES.labels(self.name, outcome).inc()
+
+    async def run(self, call: Callable[[], Awaitable[T]]) -> T:
+        self.calls += 1
+        delay = self.delay()
+        HEDGE_DELAY.labels(self.name).set(delay)
+        started: dict[asyncio.Future, float] = {}
+
+        def launch() -> asyncio.Future:
+            task = asyncio.ensure_future(call())
+            started[task] = time.monotonic()
+            return task
+
+        def observe(task: asyncio.Future) -> None:
+            # Successes and cancelled losers only (a loser's latency was at least this long); a fast
+            # failure would drag the percentile down and hedge healthy calls sooner
+            self._latencies.append(time.monotonic() - started[task])
+
+        primary = launch()
+        pending = {primary}
+        try:
+            done, pending = await asyncio.wait(pending, timeout=delay)
+            if done:
+                if primary.exception() is not None:
+                    self._record("failed")
+                    return primary.result()
+                observe(primary)
+                self._record("not_hedged")
+                return primary.result()
+            self.hedged += 1
+            hedge = launch()
+            pending.add(hedge)
+            first_error: BaseException | None = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        observe(task)
+                        won = task is hedge
+                        self.hedge_wins += won
+                        self._record("hedge_won" if won else "primary_won")
+                        return task.result()
+                    first_error = first_error or task.exception()
+            self._record("failed")
+            assert first_error is not None
+            raise first_error
+        finally:
+            for task in pending:
+                observe(task)
+                task.cancel()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_rate": round(self.hedged / self.calls, 4) if self.calls else 0.0,
+            "hedge_wins": self.hedge_wins,
+            "delay_ms": round(self.delay() * 1000, 3),
+        }
+
+
+_hedgers: dict[str, Hedger] = {}
+
+
+@lru_cache(maxsize=8)
+def _enabled(calls: str) -> frozenset[str]:
+    return frozenset(c.strip() for c in calls.split(",") if c.strip())
+
+
+def get(name: str) -> Hedger | None:
+    """The hedger for downstream call `name`, or None unless HEDGE_CALLS lists it."""
+    if name not in _enabled(config.HEDGE_CALLS):
+        return None
+    hedger = _hedgers.get(name)
+    if hedger is None:
+        hedger = _hedgers[name] = Hedger(
+            name,
+            percentile=config.HEDGE_PERCENTILE,
+            initial_delay=config.HEDGE_INITIAL_DELAY_MS / 1000,
+            min_delay=config.HEDGE_MIN_DELAY_MS / 1000,
+            max_delay=config.HEDGE_MAX_DELAY_MS / 1000,
+            window=config.HEDGE_WINDOW,
+        )
+    return hedger
+
+
+async def call(name: str, fn: Callable[[], Awaitable[T]]) -> T:
+    hedger = get(name)
+    return await (fn() if hedger is None else hedger.run(fn))
+
+
+def stats() -> dict[str, dict[str, Any]]:
+    return {name: h.stats() for name, h in sorted(_hedgers.items())}
+
+
+def reset() -> None:
+    _hedgers.clear()
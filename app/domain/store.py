@@ -1,26 +1,70 @@
 from typing import Any
 from app import db
+import app.config as config
+from app.domain.event_writer import EventRow, EventWriter
+from app.metrics import timed_store
 
+_event_writer: EventWriter | None = None
+
+def get_event_writer() -> EventWriter | None:
+    global _event_writer
+    if _event_writer is None and config.EVENT_WRITER_MODE == "batched":
+        _event_writer = EventWriter(
+            append_events,
+            max_batch=config.EVENT_WRITER_MAX_BATCH,
+            max_delay=config.EVENT_WRITER_MAX_DELAY_MS / 1000,
+        )
+    return _event_writer
+
+async def flush_events() -> None:
+    if _event_writer is not None:
+        await _event_writer.flush()
+
+# order_state_counts holds per-state order counts split over 16 shards (by order id)
+# so concurrent transitions don't all queue on one row. The CTEs below keep it in
+# step with `orders` inside the statement that inserts or re-states the order.
+_COUNT_NEW_ORDER = """
+        ins AS (
+            INSERT INTO orders(id, state, address_json)
+            VALUES (:id, 'received', CAST(:addr AS JSONB))
+            ON CONFLICT (id) DO NOTHING
+            RETURNING id, state
+        ), cnt AS (
+            INSERT INTO order_state_counts AS c (state, shard, n)
+            SELECT state, hashtext(id) & 15, 1 FROM ins
+            ON CONFLICT (state, shard) DO UPDATE SET n = c.n + EXCLUDED.n
+        )"""
+
+_COUNT_STATE_CHANGE = """
+        upd AS (
+            UPDATE orders o
+            SET state = :state, updated_at = now()
+            FROM (SELECT state FROM orders WHERE id = :id FOR UPDATE) prev
+            WHERE o.id = :id
+            RETURNING prev.state AS old_state, o.state AS new_state
+        ), cnt AS (
+            INSERT INTO order_state_counts AS c (state, shard, n)
+            SELECT d.state, hashtext(:id) & 15, d.n
+            FROM upd CROSS JOIN LATERAL (VALUES (upd.old_state, -1), (upd.new_state, 1)) AS d(state, n)
+            WHERE upd.old_state <> upd.new_state
+            ON CONFLICT (state, shard) DO UPDATE SET n = c.n + EXCLUDED.n
+        )"""
+
+@timed_store
 async def create_order(order_id: str, address: dict):
     await db.execute(
-        """
-        INSERT INTO orders(id, state, address_json)
-        VALUES (:id, 'received', CAST(:addr AS JSONB))
-        ON CONFLICT (id) DO NOTHING
-        """,
+        "WITH" + _COUNT_NEW_ORDER + " SELECT count(*) FROM ins",
         {"id": order_id, "addr": db.json_dumps(address)},
     )
 
+@timed_store
 async def update_order_state(order_id: str, state: str):
     await db.execute(
-        """
-        UPDATE orders
-        SET state = :state, updated_at = now()
-        WHERE id = :id
-        """,
+        "WITH" + _COUNT_STATE_CHANGE + " SELECT count(*) FROM upd",
         {"id": order_id, "state": state},
     )
 
+@timed_store
 async def update_address(order_id: str, address: dict):
     await db.execute(
         """
@@ -31,47 +75,217 @@ async def update_address(order_id: str, address: dict):
         {"id": order_id, "addr": db.json_dumps(address)},
     )
 
+# Every events INSERT returns its rows through an `ev` CTE and announces them on
+# EVENTS_NOTIFY_CHANNEL, which the API's event feed LISTENs on. NOTIFY is delivered at commit.
+_NOTIFY_EVENTS = (
+    "SELECT pg_notify(:channel, CAST(json_build_object('order_id', order_id, 'id', id) AS TEXT)) FROM ev"
+)
+
+# Composite writes: the row change and its event go out as one statement, so they
+# commit together in a single round trip. They bypass the batched event writer.
+
+@timed_store
+async def create_order_with_event(order_id: str, address: dict, type_: str, payload: dict | None):
+    await db.execute(
+        "WITH" + _COUNT_NEW_ORDER + """, ev AS (
+            INSERT INTO events(order_id, type, payload_json)
+            VALUES (:id, :type, CAST(:payload AS JSONB))
+            RETURNING id, order_id
+        )
+        """ + _NOTIFY_EVENTS,
+        {"id": order_id, "addr": db.json_dumps(address), "type": type_, "payload": db.json_dumps(payload or {}),
+         "channel": config.EVENTS_NOTIFY_CHANNEL},
+    )
+
+@timed_store
+async def update_order_state_with_event(order_id: str, state: str, type_: str, payload: dict | None):
+    await db.execute(
+        "WITH" + _COUNT_STATE_CHANGE + """, ev AS (
+            INSERT INTO events(order_id, type, payload_json)
+            VALUES (:id, :type, CAST(:payload AS JSONB))
+            RETURNING id, order_id
+        )
+        """ + _NOTIFY_EVENTS,
+        {"id": order_id, "state": state, "type": type_, "payload": db.json_dumps(payload or {}),
+         "channel": config.EVENTS_NOTIFY_CHANNEL},
+    )
+
+@timed_store
+async def update_address_with_event(order_id: str, address: dict, type_: str, payload: dict | None):
+    await db.execute(
+        """
+        WITH upd AS (
+            UPDATE orders
+            SET address_json = CAST(:addr AS JSONB), updated_at = now()
+            WHERE id = :id
+        ), ev AS (
+            INSERT INTO events(order_id, type, payload_json)
+            VALUES (:id, :type, CAST(:payload AS JSONB))
+            RETURNING id, order_id
+        )
+        """ + _NOTIFY_EVENTS,
+        {"id": order_id, "addr": db.json_dumps(address), "type": type_, "payload": db.json_dumps(payload or {}),
+         "channel": config.EVENTS_NOTIFY_CHANNEL},
+    )
+
+@timed_store
 async def append_event(order_id: str, type_: str, payload: dict | None):
+    writer = get_event_writer()
+    if writer is not None:
+        writer.submit(order_id, type_, payload or {})
+        return
     await db.execute(
         """
-        INSERT INTO events(order_id, type, payload_json)
-        VALUES (:oid, :type, CAST(:payload AS JSONB))
-        """,
-        {"oid": order_id, "type": type_, "payload": db.json_dumps(payload or {})},
+        WITH ev AS (
+            INSERT INTO events(order_id, type, payload_json)
+            VALUES (:oid, :type, CAST(:payload AS JSONB))
+            RETURNING id, order_id
+        )
+        """ + _NOTIFY_EVENTS,
+        {"oid": order_id, "type": type_, "payload": db.json_dumps(payload or {}), "channel": config.EVENTS_NOTIFY_CHANNEL},
     )
 
+@timed_store
+async def append_events(rows: list[EventRow]):
+    # One statement text for any batch size, so it stays a single cached prepared statement.
+    await db.execute(
+        """
+        WITH ev AS (
+            INSERT INTO events(order_id, type, payload_json)
+            SELECT oid, type, CAST(payload AS JSONB)
+            FROM unnest(CAST(:oids AS TEXT[]), CAST(:types AS TEXT[]), CAST(:payloads AS TEXT[])) AS t(oid, type, payload)
+            RETURNING id, order_id
+        )
+        """ + _NOTIFY_EVENTS,
+        {
+            "oids": [r[0] for r in rows],
+            "types": [r[1] for r in rows],
+            "payloads": [db.json_dumps(r[2] or {}) for r in rows],
+            "channel": config.EVENTS_NOTIFY_CHANNEL,
+        },
+    )
+
+@timed_store
 async def get_order(order_id: str) -> dict | None:
     return await db.fetchone(
         "SELECT id, state, address_json, created_at, updated_at FROM orders WHERE id=:id",
         {"id": order_id},
     )
 
+@timed_store
 async def get_payment_by_id(payment_id: str) -> dict | None:
     return await db.fetchone(
         "SELECT payment_id, order_id, status, amount, created_at FROM payments WHERE payment_id=:pid",
         {"pid": payment_id},
+        primary=True,
     )
 
+@timed_store
 async def insert_payment(payment_id: str, order_id: str, status: str, amount: int | float) -> bool:
-    # returns True if already existed, False if inserted now
-    existing = await get_payment_by_id(payment_id)
-    if existing:
-        return True
-    await db.execute(
+    # returns True if already existed, False if inserted now; a single race-free round trip
+    row = await db.fetchone(
         """
         INSERT INTO payments(payment_id, order_id, status, amount)
         VALUES (:pid, :oid, :status, :amount)
         ON CONFLICT (payment_id) DO NOTHING
+        RETURNING payment_id
         """,
         {"pid": payment_id, "oid": order_id, "status": status, "amount": amount},
+        primary=True,
+    )
+    return row is None
+
+@timed_store
+async def get_activity_result(workflow_id: str, run_id: str, activity_id: str) -> dict | None:
+    return await db.fetchone(
+        """
+        SELECT result_json FROM activity_ledger
+        WHERE workflow_id=:wf AND run_id=:run AND activity_id=:act
+        """,
+        {"wf": workflow_id, "run": run_id, "act": activity_id},
+        # A retried attempt must see the result its predecessor just recorded
+        primary=True,
+    )
+
+@timed_store
+async def record_activity_result(workflow_id: str, run_id: str, activity_id: str, activity_type: str, result: Any) -> Any:
+    # First writer wins: a late duplicate attempt gets the recorded result back instead of its own.
+    row = await db.fetchone(
+        """
+        INSERT INTO activity_ledger(workflow_id, run_id, activity_id, activity_type, result_json)
+        VALUES (:wf, :run, :act, :type, CAST(:result AS JSONB))
+        ON CONFLICT (workflow_id, run_id, activity_id)
+        DO UPDATE SET result_json = activity_ledger.result_json
+        RETURNING result_json
+        """,
+        {"wf": workflow_id, "run": run_id, "act": activity_id, "type": activity_type, "result": db.json_dumps(result)},
+        primary=True,
     )
-    return False
+    return row["result_json"] if row else result
 
+@timed_store
 async def get_recent_events(order_id: str, limit: int = 20) -> list[dict[str, Any]]:
     rows = await db.fetchall(
-        "SELECT id, order_id, type, payload_json, ts FROM events WHERE order_id=:id ORDER BY ts DESC LIMIT :limit",
-        {"id": order_id, "limit": limit},
+        # The ts bound lets the planner prune events partitions older than the lookback
+        "SELECT id, order_id, type, payload_json, ts FROM events "
+        "WHERE order_id=:id AND ts >= now() - make_interval(days => :days) ORDER BY ts DESC LIMIT :limit",
+        {"id": order_id, "limit": limit, "days": config.EVENTS_RECENT_LOOKBACK_DAYS},
     )
     return rows
 
+@timed_store
+async def list_orders(state: str | None = None, after: str = "", limit: int = 100) -> list[dict[str, Any]]:
+    # Keyset page by id; with a state it walks idx_orders_state_id, otherwise the primary key
+    if state is None:
+        return await db.fetchall(
+            "SELECT id, state, created_at, updated_at FROM orders WHERE id > :after ORDER BY id LIMIT :limit",
+            {"after": after, "limit": limit},
+        )
+    return await db.fetchall(
+        "SELECT id, state, created_at, updated_at FROM orders WHERE state = :state AND id > :after ORDER BY id LIMIT :limit",
+        {"state": state, "after": after, "limit": limit},
+    )
+
+@timed_store
+async def get_order_state_counts() -> dict[str, int]:
+    rows = await db.fetchall(
+        "SELECT state, CAST(sum(n) AS BIGINT) AS n FROM order_state_counts GROUP BY state HAVING sum(n) <> 0 ORDER BY state"
+    )
+    return {r["state"]: r["n"] for r in rows}
+
+@timed_store
+async def list_events(order_id: str, after: int = 0, limit: int = 100) -> list[dict[str, Any]]:
+    # Keyset page in write order: events with id > after, served by idx_events_order_id
+    return await db.fetchall(
+        "SELECT id, order_id, type, payload_json, ts FROM events WHERE order_id=:id AND id > :after ORDER BY id LIMIT :limit",
+        {"id": order_id, "after": after, "limit": limit},
+    )
+
+@timed_store
+async def list_events_for_stream(order_id: str, after: int, window_secs: float, limit: int) -> list[dict[str, Any]]:
+    # Everything past the cursor plus the recent window below it, where late commits can still appear
+    return await db.fetchall(
+        "SELECT id, order_id, type, payload_json, ts FROM events WHERE order_id=:id "
+        "AND (id > :after OR ts >= now() - make_interval(secs => :window)) ORDER BY id LIMIT :limit",
+        {"id": order_id, "after": after, "window": window_secs, "limit": limit},
+        primary=True,
+    )
 
+@timed_store
+async def get_order_status(order_id: str, limit: int = 20) -> dict[str, Any]:
+    # orders row + latest events in one round trip for /status
+    row = await db.fetchone(
+        """
+        SELECT
+          (SELECT row_to_json(o) FROM (
+             SELECT id, state, address_json, created_at, updated_at FROM orders WHERE id=:id
+           ) o) AS db_order,
+          COALESCE((SELECT json_agg(e ORDER BY e.ts DESC) FROM (
+             SELECT id, order_id, type, payload_json, ts FROM events
+             WHERE order_id=:id AND ts >= now() - make_interval(days => :days) ORDER BY ts DESC LIMIT :limit
+           ) e), CAST('[]' AS JSON)) AS events
+        """,
+        {"id": order_id, "limit": limit, "days": config.EVENTS_RECENT_LOOKBACK_DAYS},
+    )
+    assert row is not None
+    return row
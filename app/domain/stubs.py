@@ -1,51 +1,82 @@
 import asyncio, random
-from typing import Dict, Any
-from app.domain import store
+from typing import Awaitable, Callable, Dict, Any
+from temporalio.exceptions import ApplicationError
+import structlog
+
+import app.config as config
+from app.domain import breaker, hedging, store
+from app.metrics import ACTIVITY_CALL_TIMEOUTS, FLAKY_CALLS
+
+log = structlog.get_logger()
 
 async def flaky_call() -> None:
     """Either raise an error or sleep long enough to trigger an activity timeout."""
     rand_num = random.random()
     if rand_num < 0.33:
+        FLAKY_CALLS.labels("error").inc()
         raise RuntimeError("Forced failure for testing")
     if rand_num < 0.67:
+        FLAKY_CALLS.labels("hang").inc()
         await asyncio.sleep(300)  # Expect the activity layer to time out before this completes
 
+async def _downstream(activity: str, dependency: str, call: Callable[[], Awaitable[None]]) -> None:
+    """Run a stub's downstream call through its dependency's circuit breaker, bounded by the
+    calling activity's call_timeout (config.ACTIVITY_PROFILES).
+
+    A hung call inside a live worker keeps heartbeats going, so the heartbeat timeout alone only
+    catches a dead worker. Only this part is bounded: the store writes that follow must never be
+    cancelled after committing, or the retry would write them again. The breaker sits around any
+    hedging, so a cancelled hedge loser isn't counted as a failure.
+    """
+    limit = config.activity_profile(activity).call_timeout
+    if limit is None:
+        await breaker.call(dependency, call)
+        return
+    try:
+        await asyncio.wait_for(breaker.call(dependency, call), limit.total_seconds())
+    except asyncio.TimeoutError:
+        ACTIVITY_CALL_TIMEOUTS.labels(activity).inc()
+        log.warning("activity_call_timeout", activity=activity, dependency=dependency,
+                    call_timeout_secs=limit.total_seconds())
+        raise ApplicationError(
+            f"{activity} call timed out after {limit.total_seconds():.3f}s", type="CallTimeout",
+        ) from None
+
 async def order_received(order_id: str, address: dict | None = None) -> Dict[str, Any]:
-    await flaky_call()
-    await store.create_order(order_id, address or {})
-    await store.append_event(order_id, "order_received", {"address": address or {}})
+    await _downstream("receive_order", "orders", flaky_call)
+    await store.create_order_with_event(order_id, address or {}, "order_received", {"address": address or {}})
     return {"order_id": order_id, "items": [{"sku": "ABC", "qty": 1}], "address": address or {}}
 
 async def order_validated(order: Dict[str, Any]) -> bool:
-    await flaky_call()
+    await _downstream("validate_order", "orders", flaky_call)
     if not order.get("items"):
         await store.append_event(order["order_id"], "validation_failed", {"reason": "no_items"})
         raise ValueError("No items to validate")
-    await store.update_order_state(order["order_id"], "validated")
-    await store.append_event(order["order_id"], "order_validated", {})
+    await store.update_order_state_with_event(order["order_id"], "validated", "order_validated", {})
     return True
 
+# payment_charged, package_prepared and carrier_dispatched may be hedged (HEDGE_CALLS): only the
+# downstream part can run twice; the store write happens once, after the winning call.
 async def payment_charged(order: Dict[str, Any], payment_id: str) -> Dict[str, Any]:
     """Charge payment after simulating an error/timeout first. Idempotent by payment_id."""
-    await flaky_call()
+    await _downstream("charge_payment", "payment", lambda: hedging.call("payment_charged", flaky_call))
     amount = sum(int(i.get("qty", 1)) for i in order.get("items", []))
     existed = await store.insert_payment(payment_id, order["order_id"], "charged", amount)
     await store.append_event(order["order_id"], "payment_charged", {"payment_id": payment_id, "amount": amount, "already": existed})
     return {"status": "charged", "amount": amount, "payment_id": payment_id}
 
 async def order_shipped(order: Dict[str, Any]) -> str:
-    await flaky_call()
-    await store.update_order_state(order["order_id"], "shipped")
-    await store.append_event(order["order_id"], "order_shipped", {})
+    await _downstream("mark_order_shipped", "orders", flaky_call)
+    await store.update_order_state_with_event(order["order_id"], "shipped", "order_shipped", {})
     return "Shipped"
 
 async def package_prepared(order: Dict[str, Any]) -> str:
-    await flaky_call()
+    await _downstream("prepare_package", "warehouse", lambda: hedging.call("package_prepared", flaky_call))
     await store.append_event(order["order_id"], "package_prepared", {})
     return "Package ready"
 
 async def carrier_dispatched(order: Dict[str, Any]) -> str:
-    await flaky_call()
+    await _downstream("dispatch_carrier", "carrier", lambda: hedging.call("carrier_dispatched", flaky_call))
     await store.append_event(order["order_id"], "carrier_dispatched", {})
     return "Dispatched"
 
@@ -0,0 +1,129 @@
+import asyncio, json
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator
+import asyncpg
+import structlog
+from sqlalchemy.engine import make_url
+
+import app.config as config
+
+log = structlog.get_logger()
+
+
+class EventFeed:
+    """One LISTEN connection per process, fanned out to per-order subscribers.
+
+    A notification only wakes the subscribers of that order; they read the new
+    rows themselves with store.list_events(after=<last id>), so a missed or
+    coalesced notification never loses events. After a reconnect every
+    subscriber is woken once to catch up.
+    """
+
+    def __init__(self, channel: str = config.EVENTS_NOTIFY_CHANNEL) -> None:
+        self.channel = channel
+        self._subscribers: dict[str, set[asyncio.Event]] = {}
+        self._task: asyncio.Task | None = None
+        self._connected = asyncio.Event()
+
+    def _dsn(self) -> str:
+        url = make_url(config.DATABASE_URL).set(drivername="postgresql")
+        return url.render_as_string(hide_password=False)
+
+    def _wake(self, order_id: str) -> None:
+        for event in self._subscribers.get(order_id, ()):
+            event.set()
+
+    def _wake_all(self) -> None:
+        for events in self._subscribers.values():
+            for event in events:
+                event.set()
+
+    def _on_notify(self, _conn: object, _pid: int, _channel: str, payload: str) -> None:
+        try:
+            order_id = json.loads(payload)["order_id"]
+        except (ValueError, KeyError, TypeError):
+            return
+        self._wake(order_id)
+
+    async def _run(self) -> None:
+        backoff = 0.5
+        while True:
+            conn = None
+            try:
+                conn = await asyncpg.connect(self._dsn())
+                lost = asyncio.Event()
+                conn.add_termination_listener(lambda _c: lost.set())
+                await conn.add_listener(self.channel, self._on_notify)
+                self._connected.set()
+                backoff = 0.5
+                log.info("event_feed_listening", channel=self.channel)
+                self._wake_all()
+                await lost.wait()
+                log.warning("event_feed_connection_lost")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.error("event_feed_error", error=str(e), retry_in_secs=backoff)
+            finally:
+                self._connected.clear()
+                if conn is not None and not conn.is_closed():
+                    await conn.close()
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, 10.0)
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    @asynccontextmanager
+    async def subscribe(self, order_id: str) -> AsyncIterator[asyncio.Event]:
+        """Yield an Event that is set whenever `order_id` may have new events; clear it before each read."""
+        self.start()
+        wake = asyncio.Event()
+        self._subscribers.setdefault(order_id, set()).add(wake)
+        try:
+            yield wake
+        finally:
+            subs = self._subscribers.get(order_id)
+            if subs is not None:
+                subs.discard(wake)
+                if not subs:
+                    del self._subscribers[order_id]
+
+    def stats(self) -> dict[str, int | bool]:
+        return {
+            "connected": self._connected.is_set(),
+            "orders": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+        }
+
+
+class StreamCursor:
+    """Resume point and de-duplication for one SSE stream.
+
+    `after` is the highest id sent. Each read also returns the recent window
+    below it (store.list_events_for_stream); `accept` passes on only rows not
+    sent yet, so an event whose lower id committed late is still delivered once.
+    Ids missing from a read have left the window for good and are forgotten.
+    After a reconnect the window is re-sent: delivery is at-least-once by id.
+    """
+
+    def __init__(self, after: int) -> None:
+        self.after = after
+        self._sent: set[int] = set()
+
+    def accept(self, rows: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        fresh = [r for r in rows if r["id"] not in self._sent]
+        self._sent = {r["id"] for r in rows}
+        if rows:
+            self.after = max(self.after, rows[-1]["id"])
+        return fresh
@@ -1,24 +1,86 @@
-import logging, sys, structlog
+import atexit, logging, logging.handlers, queue, random, sys, structlog
+from typing import Any, Callable
+import orjson
+import app.config as config
+
+_listener: logging.handlers.QueueListener | None = None
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    rates: dict[str, float] = {}
+    for part in spec.split(","):
+        name, _, rate = part.strip().partition("=")
+        if name and rate:
+            rates[name] = min(1.0, max(0.0, float(rate)))
+    return rates
+
+class SampleLogs:
+    """Keep only a fraction of info/debug events by event name; warnings and errors always pass."""
+
+    def __init__(self, rates: dict[str, float], rand: Callable[[], float] = random.random) -> None:
+        self.exact = {k: v for k, v in rates.items() if not k.endswith("*")}
+        # Longest prefix wins
+        self.prefixes = sorted(((k[:-1], v) for k, v in rates.items() if k.endswith("*")), key=lambda kv: -len(kv[0]))
+        self.rand = rand
+
+    def rate(self, event: str) -> float:
+        if event in self.exact:
+            return self.exact[event]
+        for prefix, rate in self.prefixes:
+            if event.startswith(prefix):
+                return rate
+        return 1.0
+
+    def __call__(self, _logger: Any, method_name: str, event_dict: dict) -> dict:
+        if method_name in ("debug", "info"):
+            rate = self.rate(str(event_dict.get("event", "")))
+            if rate < 1.0 and self.rand() >= rate:
+                raise structlog.DropEvent
+        return event_dict
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()  # drains whatever is still queued
+        _listener = None
+
+atexit.register(_stop_listener)
+
+def _orjson_dumps(obj: Any, **_: Any) -> str:
+    return orjson.dumps(obj, default=str, option=orjson.OPT_NON_STR_KEYS).decode()
 
 def setup_logging():
+    global _listener
     timestamper = structlog.processors.TimeStamper(fmt="iso", key="ts")
+    processors: list[Any] = []
+    rates = parse_sample_rates(config.LOG_SAMPLE_RATES)
+    if rates:
+        # First, so dropped events skip the rest of the chain
+        processors.append(SampleLogs(rates))
+    processors += [
+        timestamper,
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.processors.StackInfoRenderer(),
+        structlog.processors.format_exc_info,
+        structlog.processors.JSONRenderer(serializer=_orjson_dumps) if config.LOG_RENDERER == "orjson"
+        else structlog.processors.JSONRenderer(),
+    ]
     structlog.configure(
-        processors=[
-            timestamper,
-            structlog.stdlib.add_logger_name,
-            structlog.stdlib.add_log_level,
-            structlog.processors.StackInfoRenderer(),
-            structlog.processors.format_exc_info,
-            structlog.processors.JSONRenderer(),
-        ],
+        processors=processors,
         logger_factory=structlog.stdlib.LoggerFactory(),
         wrapper_class=structlog.stdlib.BoundLogger,
         cache_logger_on_first_use=True,
     )
     handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(logging.Formatter("%(message)s"))
+    _stop_listener()
     root = logging.getLogger()
-    root.handlers = [handler]
+    if config.LOG_ASYNC:
+        # The event loop only enqueues; a listener thread does the blocking stdout writes
+        log_queue: queue.SimpleQueue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(log_queue, handler, respect_handler_level=True)
+        _listener.start()
+        root.handlers = [logging.handlers.QueueHandler(log_queue)]
+    else:
+        root.handlers = [handler]
     root.setLevel(logging.INFO)
-
-
@@ -1,49 +1,206 @@
+import asyncio, json, time
 import structlog
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.middleware.cors import CORSMiddleware
+from google.protobuf.json_format import MessageToDict, ParseDict, ParseError
+from temporalio.api.common.v1 import Payloads
+from fastapi.responses import StreamingResponse
+from prometheus_client import make_asgi_app
 from temporalio.client import Client
+from temporalio.exceptions import WorkflowAlreadyStartedError
+from temporalio.service import RPCError, RPCStatusCode
 from datetime import timedelta
 
 from app.logging_setup import setup_logging
 import app.config as config
-from app.schemas import StartOrderRequest, UpdateAddressRequest, StatusResponse
+from app.schemas import (
+    StartOrderRequest, UpdateAddressRequest, StatusResponse,
+    BatchStartRequest, BatchStartItem, BatchItemResult, BatchResponse, BulkSignalRequest, EventsPage,
+    OrdersPage, OrderStats,
+)
 from app.domain import store
-from app.workflows.order_workflow import OrderWorkflow
+from app import converter, db, metrics
+from app.cache import TTLCache
+from app.concurrency import bounded_map
+from app.event_feed import EventFeed, StreamCursor
+from app.workflows.order_workflow import ORDER_STEP, OrderWorkflow
 
 setup_logging()
 log = structlog.get_logger().bind(service="api")
 
 app = FastAPI(title="Trellis Temporal Demo")
+app.mount("/metrics", make_asgi_app())
+# The Temporal UI calls /codec/* from the browser
+app.add_middleware(
+    CORSMiddleware, allow_origins=config.CODEC_CORS_ORIGINS, allow_methods=["POST"],
+    allow_headers=["Content-Type", "X-Namespace"],
+)
+payload_codec = converter.codec()
+metrics.register_pool_gauges()
 temporal_client: Client | None = None
+status_cache: TTLCache | None = (
+    TTLCache(config.STATUS_CACHE_TTL_MS / 1000, config.STATUS_CACHE_MAX_ENTRIES)
+    if config.STATUS_CACHE_TTL_MS > 0 else None
+)
+# LISTEN connection for the SSE stream; opened on the first subscriber
+event_feed = EventFeed()
 
 @app.on_event("startup")
 async def on_startup():
     global temporal_client
-    temporal_client = await Client.connect(config.TEMPORAL_TARGET)
+    temporal_client = await Client.connect(
+        config.TEMPORAL_TARGET, runtime=metrics.temporal_runtime(), data_converter=converter.data_converter(),
+    )
+    await db.warm_up()
     log.info("startup_complete", temporal=config.TEMPORAL_TARGET)
 
+@app.on_event("shutdown")
+async def on_shutdown():
+    await event_feed.close()
+    await db.dispose()
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = getattr(request.scope.get("route"), "path", "unmatched")
+        metrics.HTTP_SECONDS.labels(request.method, route, str(status)).observe(time.perf_counter() - started)
+
 def wf_id(order_id: str) -> str:
     return f"order-{order_id}"
 
+def order_id_of(workflow_id: str) -> str:
+    return workflow_id.removeprefix("order-")
+
+def invalidate_status(order_id: str) -> None:
+    if status_cache is not None:
+        status_cache.invalidate(order_id)
+
+async def start_order_workflow(order_id: str, payment_id: str, address: dict):
+    assert temporal_client
+    handle = await temporal_client.start_workflow(
+        OrderWorkflow.run,
+        {
+            "order_id": order_id,
+            "payment_id": payment_id,
+            "address": address,
+            "bookkeeping": config.BOOKKEEPING_MODE,
+            "shipping": config.SHIPPING_MODE,
+            "index_step": config.ORDER_STEP_SEARCH_ATTRIBUTE,
+        },
+        id=wf_id(order_id),
+        task_queue=config.ORDERS_TQ,
+        run_timeout=timedelta(seconds=config.RUN_TIMEOUT_SECS),
+    )
+    invalidate_status(order_id)
+    return handle
+
+def batch_response(results: list[BatchItemResult]) -> BatchResponse:
+    counts: dict[str, int] = {}
+    for r in results:
+        counts[r.status] = counts.get(r.status, 0) + 1
+    return BatchResponse(results=results, counts=counts)
+
+@app.get("/orders", response_model=OrdersPage)
+async def list_orders(state: str | None = None, after: str = "", limit: int = Query(100, ge=1)):
+    limit = min(limit, config.ORDERS_PAGE_MAX)
+    orders = await store.list_orders(state, after, limit)
+    return OrdersPage(orders=orders, next_after=orders[-1]["id"] if len(orders) == limit else None)
+
+@app.get("/orders/stats", response_model=OrderStats)
+async def order_stats():
+    counts = await store.get_order_state_counts()
+    return OrderStats(counts=counts, total=sum(counts.values()))
+
 @app.post("/orders/{order_id}/start")
 async def start_order(order_id: str, req: StartOrderRequest):
     assert temporal_client
     try:
-        handle = await temporal_client.start_workflow(
-            OrderWorkflow.run,
-            {"order_id": order_id, "payment_id": req.payment_id, "address": req.address},
-            id=wf_id(order_id),
-            task_queue=config.ORDERS_TQ,
-            run_timeout=timedelta(seconds=config.RUN_TIMEOUT_SECS),
-        )
+        handle = await start_order_workflow(order_id, req.payment_id, req.address)
         return {"workflow_id": handle.id, "run_id": handle.first_execution_run_id}
     except Exception as e:
         raise HTTPException(status_code=409, detail=str(e))
 
+@app.post("/orders/start-batch", response_model=BatchResponse)
+async def start_orders_batch(req: BatchStartRequest):
+    assert temporal_client
+    if len(req.orders) > config.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"at most {config.BATCH_MAX_ITEMS} orders per batch")
+
+    async def start_one(item: BatchStartItem) -> BatchItemResult:
+        try:
+            handle = await start_order_workflow(item.order_id, item.payment_id, item.address)
+        except WorkflowAlreadyStartedError:
+            return BatchItemResult(order_id=item.order_id, status="already_exists", workflow_id=wf_id(item.order_id))
+        except Exception as e:
+            return BatchItemResult(order_id=item.order_id, status="error", error=str(e))
+        return BatchItemResult(order_id=item.order_id, status="started", workflow_id=handle.id,
+                               run_id=handle.first_execution_run_id)
+
+    results = await bounded_map(start_one, req.orders, config.BATCH_CONCURRENCY)
+    log.info("batch_start", orders=len(results), concurrency=config.BATCH_CONCURRENCY)
+    return batch_response(results)
+
+async def bulk_targets(req: BulkSignalRequest) -> list[str]:
+    assert temporal_client
+    if req.order_ids is not None:
+        if len(req.order_ids) > config.BATCH_MAX_ITEMS:
+            raise HTTPException(status_code=413, detail=f"at most {config.BATCH_MAX_ITEMS} orders per batch")
+        return list(dict.fromkeys(req.order_ids))
+    # Caller queries are scoped to order workflows so a broad filter can't signal anything else
+    query = "WorkflowType = 'OrderWorkflow' AND " + (
+        f"({req.query})" if req.query else f"ExecutionStatus = 'Running' AND {ORDER_STEP.name} = '{req.step}'"
+    )
+    # Capped at BATCH_MAX_ITEMS; visibility is eventually consistent, so re-run for the remainder
+    try:
+        ids = [order_id_of(wf.id) async for wf in temporal_client.list_workflows(query, limit=config.BATCH_MAX_ITEMS)]
+    except RPCError as e:
+        if e.status == RPCStatusCode.INVALID_ARGUMENT:
+            raise HTTPException(status_code=400, detail=f"invalid visibility query: {e.message}")
+        raise
+    log.info("bulk_signal_query", query=query, matched=len(ids))
+    return list(dict.fromkeys(ids))
+
+async def signal_orders(order_ids: list[str], signal, name: str) -> BatchResponse:
+    assert temporal_client
+    client = temporal_client
+
+    async def signal_one(order_id: str) -> BatchItemResult:
+        handle = client.get_workflow_handle(wf_id(order_id))
+        try:
+            await handle.signal(signal)
+        except RPCError as e:
+            status = "not_found" if e.status == RPCStatusCode.NOT_FOUND else "error"
+            return BatchItemResult(order_id=order_id, status=status, workflow_id=handle.id, error=e.message)
+        except Exception as e:
+            return BatchItemResult(order_id=order_id, status="error", workflow_id=handle.id, error=str(e))
+        invalidate_status(order_id)
+        return BatchItemResult(order_id=order_id, status="signalled", workflow_id=handle.id)
+
+    results = await bounded_map(signal_one, order_ids, config.BATCH_CONCURRENCY)
+    log.info("bulk_signal", signal=name, orders=len(results), concurrency=config.BATCH_CONCURRENCY)
+    return batch_response(results)
+
+@app.post("/orders/approve-batch", response_model=BatchResponse)
+async def approve_orders_batch(req: BulkSignalRequest):
+    return await signal_orders(await bulk_targets(req), OrderWorkflow.approve, "approve")
+
+@app.post("/orders/cancel-batch", response_model=BatchResponse)
+async def cancel_orders_batch(req: BulkSignalRequest):
+    return await signal_orders(await bulk_targets(req), OrderWorkflow.cancel, "cancel")
+
 @app.post("/orders/{order_id}/signals/cancel")
 async def signal_cancel(order_id: str):
     assert temporal_client
     handle = temporal_client.get_workflow_handle(wf_id(order_id))
     await handle.signal(OrderWorkflow.cancel)
+    invalidate_status(order_id)
     return {"ok": True}
 
 @app.post("/orders/{order_id}/signals/update-address")
@@ -51,6 +208,7 @@ async def signal_update_address(order_id: str, req: UpdateAddressRequest):
     assert temporal_client
     handle = temporal_client.get_workflow_handle(wf_id(order_id))
     await handle.signal(OrderWorkflow.update_address, req.address)
+    invalidate_status(order_id)
     return {"ok": True}
 
 @app.post("/orders/{order_id}/signals/approve")
@@ -58,21 +216,102 @@ async def signal_approve(order_id: str):
     assert temporal_client
     handle = temporal_client.get_workflow_handle(wf_id(order_id))
     await handle.signal(OrderWorkflow.approve)
+    invalidate_status(order_id)
     return {"ok": True}
 
 @app.get("/orders/{order_id}/status", response_model=StatusResponse)
 async def get_status(order_id: str):
     assert temporal_client
+    if status_cache is not None:
+        cached = status_cache.get(order_id)
+        if cached is not None:
+            return cached
     handle = temporal_client.get_workflow_handle(wf_id(order_id))
-    wf = {}
-    try:
-        wf = await handle.query(OrderWorkflow.status)
-    except Exception as e:
-        wf = {"error": str(e)}
 
-    events = await store.get_recent_events(order_id, limit=20)
-    order_row = await store.get_order(order_id)
-    return StatusResponse(workflow=wf, events=events, db_order=order_row)
+    async def query_workflow() -> dict:
+        try:
+            return await handle.query(OrderWorkflow.status)
+        except Exception as e:
+            return {"error": str(e)}
+
+    wf, snapshot = await asyncio.gather(query_workflow(), store.get_order_status(order_id, limit=20))
+    resp = StatusResponse(workflow=wf, events=snapshot["events"], db_order=snapshot["db_order"])
+    if status_cache is not None:
+        status_cache.set(order_id, resp)
+    return resp
+
+@app.get("/orders/{order_id}/events", response_model=EventsPage)
+async def list_order_events(order_id: str, after: int = Query(0, ge=0), limit: int = Query(100, ge=1)):
+    events = await store.list_events(order_id, after, min(limit, config.EVENTS_PAGE_MAX))
+    return EventsPage(events=events, next_after=events[-1]["id"] if events else after)
 
+def sse_message(event: dict, resume_id: int) -> str:
+    # The SSE id is the stream's resume cursor, not the event's own id: after a late
+    # (lower-id) event it must not move the cursor backwards.
+    return f"id: {resume_id}\nevent: {event['type']}\ndata: {json.dumps(jsonable_encoder(event))}\n\n"
 
+async def event_stream(order_id: str, after: int, request: Request):
+    cursor = StreamCursor(after)
+    resume_id = after
+    async with event_feed.subscribe(order_id) as wake:
+        while not await request.is_disconnected():
+            # Clear before reading so a NOTIFY that lands mid-read still wakes the next wait
+            wake.clear()
+            # Woken by a NOTIFY sent at the primary's commit, so read the primary (a replica may lag)
+            rows = await store.list_events_for_stream(
+                order_id, cursor.after, config.EVENT_STREAM_REORDER_WINDOW_SECS, config.EVENTS_PAGE_MAX,
+            )
+            before = cursor.after
+            for event in cursor.accept(rows):
+                resume_id = max(resume_id, event["id"])
+                yield sse_message(event, resume_id)
+            if len(rows) == config.EVENTS_PAGE_MAX and cursor.after > before:
+                continue
+            try:
+                await asyncio.wait_for(wake.wait(), config.EVENT_STREAM_HEARTBEAT_SECS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+
+@app.get("/orders/{order_id}/events/stream")
+async def stream_order_events(order_id: str, request: Request, after: int = Query(0, ge=0)):
+    # EventSource reconnects with Last-Event-ID; resume from there
+    last_id = request.headers.get("last-event-id", "")
+    if last_id.isdigit():
+        after = int(last_id)
+    return StreamingResponse(
+        event_stream(order_id, after, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.get("/internal/event-feed")
+async def get_event_feed():
+    return event_feed.stats()
+
+# Codec server for the Temporal UI/CLI: {"payloads": [...]} in proto JSON both ways
+
+async def _codec_payloads(request: Request) -> Payloads:
+    try:
+        return ParseDict(await request.json(), Payloads())
+    except (ValueError, ParseError) as e:
+        raise HTTPException(status_code=400, detail=f"expected {{\"payloads\": [...]}} in proto JSON: {e}")
+
+@app.post("/codec/encode")
+async def codec_encode(request: Request):
+    payloads = await _codec_payloads(request)
+    return MessageToDict(Payloads(payloads=await payload_codec.encode(payloads.payloads)))
+
+@app.post("/codec/decode")
+async def codec_decode(request: Request):
+    payloads = await _codec_payloads(request)
+    try:
+        decoded = await payload_codec.decode(payloads.payloads)
+    except converter.PayloadTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    except converter.CodecError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return MessageToDict(Payloads(payloads=decoded))
 
+@app.get("/internal/db-pool")
+async def get_db_pool():
+    return db.pool_stats()
@@ -0,0 +1,163 @@
+"""Events partition maintenance; run it daily (cron, CronJob):
+
+    python -m app.maintenance [--premake-days 7] [--retention-days 30] [--archive-dir DIR] [--dry-run]
+
+Creates the daily `events_pYYYYMMDD` partitions ahead of time, then detaches
+every partition whose range ended before the retention cutoff. With an archive
+directory the detached table is copied to DIR/<name>.csv.gz and dropped;
+without one it is left as a standalone table for an operator to deal with.
+"""
+import argparse, asyncio, gzip, os, pathlib, re
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+import app.config as config
+from app import db
+from app.logging_setup import setup_logging
+
+PARTITION_PREFIX = "events_p"
+DEFAULT_PARTITION = "events_default"
+_LOWER_BOUND = re.compile(r"FROM \('([^']+)'\)")
+_UPPER_BOUND = re.compile(r"TO \('([^']+)'\)")
+
+log = structlog.get_logger().bind(service="maintenance")
+
+
+@dataclass
+class Partition:
+    name: str
+    bound: str  # pg_get_expr(relpartbound), e.g. FOR VALUES FROM ('...') TO ('...')
+
+    @property
+    def lower(self) -> datetime | None:
+        """Start of the partition's range; None for DEFAULT and MINVALUE."""
+        m = _LOWER_BOUND.search(self.bound)
+        return datetime.fromisoformat(m.group(1)) if m else None
+
+    @property
+    def upper(self) -> datetime | None:
+        """End of the partition's range; None for DEFAULT and MAXVALUE."""
+        m = _UPPER_BOUND.search(self.bound)
+        return datetime.fromisoformat(m.group(1)) if m else None
+
+    def covers(self, ts: datetime) -> bool:
+        if self.bound == "DEFAULT":
+            return False
+        lower, upper = self.lower, self.upper
+        return (lower is None or lower <= ts) and (upper is None or ts < upper)
+
+
+def partition_name(day: date) -> str:
+    return f"{PARTITION_PREFIX}{day:%Y%m%d}"
+
+def day_start(day: date) -> datetime:
+    return datetime(day.year, day.month, day.day, tzinfo=timezone.utc)
+
+def expired(partitions: list[Partition], cutoff: datetime) -> list[Partition]:
+    return [p for p in partitions if p.upper is not None and p.upper <= cutoff]
+
+async def list_partitions(conn: AsyncConnection) -> list[Partition]:
+    rows = await conn.execute(text(
+        "SELECT c.relname, pg_get_expr(c.relpartbound, c.oid) FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid WHERE i.inhparent = 'events'::regclass ORDER BY c.relname"
+    ))
+    return [Partition(name, bound) for name, bound in rows]
+
+async def list_detached(conn: AsyncConnection) -> list[str]:
+    """Former partitions left behind by a run that detached but didn't finish archiving."""
+    rows = await conn.execute(text(
+        "SELECT c.relname FROM pg_class c JOIN pg_namespace n ON n.oid = c.relnamespace "
+        "WHERE n.nspname = current_schema() AND c.relkind = 'r' AND NOT c.relispartition "
+        "AND (c.relname LIKE 'events\\_p%' OR c.relname = 'events_legacy') ORDER BY c.relname"
+    ))
+    return [name for (name,) in rows]
+
+async def create_partition(day: date) -> int:
+    """Create the partition for `day`, moving any rows that already landed in the default partition."""
+    name, lo, hi = partition_name(day), day_start(day).isoformat(), day_start(day + timedelta(days=1)).isoformat()
+    in_range = f"ts >= '{lo}' AND ts < '{hi}'"
+    async with db.get_engine().begin() as conn:
+        moved = (await conn.execute(text(f"SELECT count(*) FROM {DEFAULT_PARTITION} WHERE {in_range}"))).scalar_one()
+        if moved:
+            await conn.exec_driver_sql(
+                f"CREATE TEMP TABLE _events_moved ON COMMIT DROP AS SELECT * FROM {DEFAULT_PARTITION} WHERE {in_range}"
+            )
+            await conn.exec_driver_sql(f"DELETE FROM {DEFAULT_PARTITION} WHERE {in_range}")
+        await conn.exec_driver_sql(f"CREATE TABLE {name} PARTITION OF events FOR VALUES FROM ('{lo}') TO ('{hi}')")
+        if moved:
+            await conn.exec_driver_sql("INSERT INTO events SELECT * FROM _events_moved")
+    return moved
+
+async def archive(name: str, archive_dir: pathlib.Path) -> pathlib.Path:
+    """COPY a detached table to archive_dir/<name>.csv.gz, then drop it."""
+    archive_dir.mkdir(parents=True, exist_ok=True)
+    path = archive_dir / f"{name}.csv.gz"
+    tmp = path.with_name(path.name + ".tmp")
+    async with db.get_engine().connect() as conn:
+        raw = (await conn.get_raw_connection()).driver_connection
+        with gzip.open(tmp, "wb") as f:
+            async def write(chunk: bytes) -> None:
+                f.write(chunk)
+            await raw.copy_from_table(name, output=write, format="csv", header=True)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)  # only a complete file gets the final name
+        await conn.exec_driver_sql(f"DROP TABLE {name}")
+        await conn.commit()
+    return path
+
+async def run(premake_days: int, retention_days: int, archive_dir: str, dry_run: bool = False) -> dict:
+    today = datetime.now(timezone.utc).date()
+    cutoff = day_start(today - timedelta(days=retention_days))
+    summary: dict = {"created": [], "moved_from_default": 0, "detached": [], "archived": []}
+
+    async with db.get_engine().connect() as conn:
+        existing = await list_partitions(conn)
+    for offset in range(premake_days + 1):
+        day = today + timedelta(days=offset)
+        if any(p.covers(day_start(day)) for p in existing):
+            continue
+        summary["created"].append(partition_name(day))
+        if not dry_run:
+            summary["moved_from_default"] += await create_partition(day)
+
+    async with db.get_engine().connect() as conn:
+        old = expired(await list_partitions(conn), cutoff)
+    for p in old:
+        summary["detached"].append(p.name)
+        if not dry_run:
+            async with db.get_engine().begin() as conn:
+                await conn.exec_driver_sql(f"ALTER TABLE events DETACH PARTITION {p.name}")
+
+    if archive_dir:
+        async with db.get_engine().connect() as conn:
+            pending = await list_detached(conn)
+        if dry_run:
+            pending = [p.name for p in old] + pending
+        for name in pending:
+            if not dry_run:
+                await archive(name, pathlib.Path(archive_dir))
+            summary["archived"].append(name)
+    return summary
+
+
+async def main(argv: list[str] | None = None) -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--premake-days", type=int, default=config.EVENTS_PARTITION_PREMAKE_DAYS)
+    p.add_argument("--retention-days", type=int, default=config.EVENTS_RETENTION_DAYS)
+    p.add_argument("--archive-dir", default=config.EVENTS_ARCHIVE_DIR, help="empty: detach only")
+    p.add_argument("--dry-run", action="store_true", help="log what would change without changing it")
+    args = p.parse_args(argv)
+    setup_logging()
+    try:
+        summary = await run(args.premake_days, args.retention_days, args.archive_dir, args.dry_run)
+    finally:
+        await db.dispose()
+    log.info("events_maintenance_done", dry_run=args.dry_run, retention_days=args.retention_days, **summary)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
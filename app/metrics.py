@@ -0,0 +1,78 @@
+import functools, time
+from typing import Any, Awaitable, Callable, TypeVar
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
+from temporalio.runtime import PrometheusConfig, Runtime, TelemetryConfig
+
+import app.config as config
+
+ACTIVITY_SECONDS = Histogram(
+    "trellis_activity_duration_seconds", "Activity attempt duration", ["activity", "outcome"],
+)
+ACTIVITY_RETRIES = Counter(
+    "trellis_activity_retries_total", "Activity attempts after the first", ["activity"],
+)
+ACTIVITY_CALL_TIMEOUTS = Counter(
+    "trellis_activity_call_timeouts_total", "Activity attempts failed by their profile's call_timeout", ["activity"],
+)
+STORE_SECONDS = Histogram(
+    "trellis_store_duration_seconds", "Time spent in app.domain.store calls", ["op"],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+FLAKY_CALLS = Counter(
+    "trellis_flaky_call_failures_total", "Injected stubs.flaky_call failures", ["kind"],
+)
+HEDGE_OUTCOMES = Counter(
+    "trellis_hedge_calls_total", "Hedged downstream calls by outcome", ["call", "outcome"],
+)
+HEDGE_DELAY = Gauge("trellis_hedge_delay_seconds", "Current adaptive hedge delay", ["call"])
+BREAKER_STATE = Gauge(
+    "trellis_circuit_breaker_state", "Downstream circuit breaker state (0 closed, 1 half-open, 2 open)", ["dependency"],
+)
+BREAKER_REJECTED = Counter(
+    "trellis_circuit_breaker_rejected_total", "Calls failed fast by an open circuit breaker", ["dependency"],
+)
+HTTP_SECONDS = Histogram(
+    "trellis_http_request_duration_seconds", "API request duration", ["method", "route", "status"],
+)
+DB_POOL_IN_USE = Gauge("trellis_db_pool_in_use", "DB connections checked out")
+DB_POOL_CONNECTING = Gauge(
+    "trellis_db_pool_connecting", "DB checkouts in progress (waiting on the pool or opening a connection)"
+)
+DB_REPLICA_LAG = Gauge("trellis_db_replica_lag_seconds", "Last measured read-replica lag (-1 = unknown)")
+
+F = TypeVar("F", bound=Callable[..., Awaitable[Any]])
+
+def timed_store(fn: F) -> F:
+    """Record a store function's wall time under its name."""
+    hist = STORE_SECONDS.labels(fn.__name__)
+
+    @functools.wraps(fn)
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        try:
+            return await fn(*args, **kwargs)
+        finally:
+            hist.observe(time.perf_counter() - started)
+    return wrapper  # type: ignore[return-value]
+
+def register_pool_gauges() -> None:
+    from app import db
+    DB_POOL_IN_USE.set_function(lambda: db.pool_stats()["in_use"])
+    DB_POOL_CONNECTING.set_function(lambda: db.pool_stats()["connecting"])
+    if config.DATABASE_REPLICA_URL:
+        DB_REPLICA_LAG.set_function(lambda: -1 if db.replica_lag() is None else db.replica_lag())
+
+def start_metrics_server() -> None:
+    """Serve this process's metrics on METRICS_PORT (workers; the API mounts them on its own app)."""
+    port = config.METRICS_PORT
+    if port > 0:
+        register_pool_gauges()
+        start_http_server(port)
+
+def temporal_runtime() -> Runtime | None:
+    """SDK runtime exporting Temporal worker/client metrics (task latencies, slots, sticky cache) to Prometheus."""
+    if config.TEMPORAL_METRICS_PORT <= 0:
+        return None
+    return Runtime(telemetry=TelemetryConfig(
+        metrics=PrometheusConfig(bind_address=f"0.0.0.0:{config.TEMPORAL_METRICS_PORT}"),
+    ))
@@ -1,23 +1,45 @@
-import asyncio, pathlib
+import asyncio, pathlib, re
 from sqlalchemy import text
 from app.db import get_engine
 
+MIGRATIONS_DIR = pathlib.Path(__file__).parent / "migrations"
+
+_LINE_COMMENT = re.compile(r"--[^\n]*")
+
 def _split_sql(sql: str) -> list[str]:
-    # naive split by semicolon; ignores semicolons in literals (not present in our schema)
-    parts = [s.strip() for s in sql.split(";")]
-    return [p for p in parts if p]
+    # split by semicolon, except inside $$-quoted bodies (DO blocks, functions) and
+    # `--` comments; ignores semicolons in other literals (not present in our schema)
+    parts, current = [], []
+    for i, chunk in enumerate(sql.split("$$")):
+        if i % 2:
+            current.append(f"$${chunk}$$")
+            continue
+        pieces = _LINE_COMMENT.sub("", chunk).split(";")
+        current.append(pieces[0])
+        for piece in pieces[1:]:
+            parts.append("".join(current))
+            current = [piece]
+    parts.append("".join(current))
+    return [p.strip() for p in parts if p.strip()]
 
 async def main():
     engine = get_engine()
-    sql_path = pathlib.Path(__file__).parent / "migrations" / "001_init.sql"
-    sql = sql_path.read_text()
-    stmts = _split_sql(sql)
     async with engine.begin() as conn:
-        for stmt in stmts:
-            await conn.execute(text(stmt))
-    print("Migration applied.")
+        await conn.execute(text(
+            "CREATE TABLE IF NOT EXISTS schema_migrations ("
+            "version TEXT PRIMARY KEY, applied_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        ))
+        applied = set((await conn.execute(text("SELECT version FROM schema_migrations"))).scalars())
+    # Each file runs once, in name order, in its own transaction.
+    for path in sorted(MIGRATIONS_DIR.glob("*.sql")):
+        if path.stem in applied:
+            continue
+        async with engine.begin() as conn:
+            for stmt in _split_sql(path.read_text()):
+                await conn.exec_driver_sql(stmt)
+            await conn.execute(text("INSERT INTO schema_migrations(version) VALUES (:v)"), {"v": path.stem})
+        print(f"Migration applied: {path.name}")
+    print("Migrations up to date.")
 
 if __name__ == "__main__":
     asyncio.run(main())
-
-
@@ -0,0 +1,12 @@
+-- One row per completed side-effecting activity. Retries return result_json instead of re-running.
+CREATE TABLE IF NOT EXISTS activity_ledger (
+  workflow_id TEXT NOT NULL,
+  run_id TEXT NOT NULL,
+  activity_id TEXT NOT NULL,
+  activity_type TEXT NOT NULL,
+  result_json JSONB,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (workflow_id, run_id, activity_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_activity_ledger_created ON activity_ledger(created_at);
@@ -0,0 +1,41 @@
+-- Range-partition events by ts, one partition per UTC day. The existing heap is attached as a single
+-- partition covering everything before tomorrow, so no rows are copied. python -m app.maintenance keeps
+-- partitions created ahead of time and archives the ones past retention.
+ALTER TABLE events RENAME TO events_legacy;
+ALTER INDEX events_pkey RENAME TO events_legacy_pkey;
+ALTER INDEX idx_events_order_ts RENAME TO idx_events_legacy_order_ts;
+
+CREATE TABLE events (
+  id BIGINT NOT NULL DEFAULT nextval('events_id_seq'),
+  order_id TEXT NOT NULL,
+  type TEXT NOT NULL,
+  payload_json JSONB,
+  ts TIMESTAMPTZ NOT NULL DEFAULT now(),
+  PRIMARY KEY (id, ts)
+) PARTITION BY RANGE (ts);
+
+ALTER SEQUENCE events_id_seq OWNED BY events.id;
+ALTER TABLE events_legacy ALTER COLUMN id DROP DEFAULT;
+CREATE INDEX idx_events_order_ts ON events(order_id, ts DESC);
+
+ALTER TABLE events ATTACH PARTITION events_legacy
+  FOR VALUES FROM (MINVALUE) TO ((date_trunc('day', now() AT TIME ZONE 'UTC') + interval '1 day') AT TIME ZONE 'UTC');
+
+-- Catches rows outside every daily partition (e.g. maintenance stopped running). Maintenance moves them out.
+CREATE TABLE events_default PARTITION OF events DEFAULT;
+
+DO $$
+DECLARE
+  d date;
+BEGIN
+  FOR i IN 1..7 LOOP
+    d := (now() AT TIME ZONE 'UTC')::date + i;
+    EXECUTE format(
+      'CREATE TABLE IF NOT EXISTS %I PARTITION OF events FOR VALUES FROM (%L) TO (%L)',
+      'events_p' || to_char(d, 'YYYYMMDD'),
+      d::timestamp AT TIME ZONE 'UTC',
+      (d + 1)::timestamp AT TIME ZONE 'UTC'
+    );
+  END LOOP;
+END
+$$;
@@ -0,0 +1,2 @@
+-- Keyset pagination of one order's events by id (GET /orders/{id}/events and the SSE stream).
+CREATE INDEX IF NOT EXISTS idx_events_order_id ON events(order_id, id);
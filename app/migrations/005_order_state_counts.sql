@@ -0,0 +1,16 @@
+-- Per-state order counts for /orders/stats, maintained by store.* in the same statement as the
+-- orders write. 16 shards per state (hashtext(order_id) & 15) spread concurrent updates.
+CREATE TABLE IF NOT EXISTS order_state_counts (
+  state TEXT NOT NULL,
+  shard SMALLINT NOT NULL,
+  n BIGINT NOT NULL DEFAULT 0,
+  PRIMARY KEY (state, shard)
+);
+
+INSERT INTO order_state_counts(state, shard, n)
+SELECT state, hashtext(id) & 15, count(*) FROM orders GROUP BY 1, 2
+ON CONFLICT (state, shard) DO UPDATE SET n = EXCLUDED.n;
+
+-- Keyset listing by state (GET /orders?state=&after=). Supersedes idx_orders_state.
+CREATE INDEX IF NOT EXISTS idx_orders_state_id ON orders(state, id);
+DROP INDEX IF EXISTS idx_orders_state;
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 from typing import Any, Optional
 
 class StartOrderRequest(BaseModel):
@@ -14,3 +14,44 @@ class StatusResponse(BaseModel):
     db_order: Optional[dict] = None
 
 
+
+class BatchStartItem(StartOrderRequest):
+    order_id: str = Field(..., min_length=1)
+
+class BatchStartRequest(BaseModel):
+    orders: list[BatchStartItem] = Field(..., min_length=1)
+
+class BatchItemResult(BaseModel):
+    order_id: str
+    status: str  # started | already_exists | signalled | not_found | error
+    workflow_id: Optional[str] = None
+    run_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkSignalRequest(BaseModel):
+    """Targets for a bulk signal: explicit ids, every running order at a step, or a visibility query."""
+    order_ids: Optional[list[str]] = Field(None, min_length=1)
+    step: Optional[str] = Field(None, pattern=r"^[A-Za-z0-9_]+$")
+    query: Optional[str] = Field(None, min_length=1)
+
+    @model_validator(mode="after")
+    def exactly_one_target(self) -> "BulkSignalRequest":
+        if sum(t is not None for t in (self.order_ids, self.step, self.query)) != 1:
+            raise ValueError("set exactly one of order_ids, step, query")
+        return self
+
+class BatchResponse(BaseModel):
+    results: list[BatchItemResult]
+    counts: dict[str, int]
+
+class EventsPage(BaseModel):
+    events: list[dict[str, Any]]
+    next_after: int  # pass as ?after= to get the next page
+
+class OrdersPage(BaseModel):
+    orders: list[dict[str, Any]]
+    next_after: Optional[str] = None  # None on the last page
+
+class OrderStats(BaseModel):
+    counts: dict[str, int]
+    total: int
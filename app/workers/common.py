@@ -0,0 +1,53 @@
+import asyncio, os, signal
+from datetime import timedelta
+from typing import Callable, Sequence
+import structlog
+from temporalio.client import Client
+from temporalio.worker import Worker
+
+import app.config as config
+from app import converter, db, metrics
+from app.activities.interceptors import CircuitOpenInterceptor, EventFlushInterceptor, MetricsInterceptor
+from app.domain import breaker, hedging, stubs, store
+from app.logging_setup import setup_logging
+from app.workers.options import describe, worker_options
+from app.workflows.sandbox import workflow_runner
+
+async def run_worker(name: str, task_queue: str, workflows: Sequence[type], activities: Sequence[Callable]) -> None:
+    """Run one worker until SIGTERM/SIGINT, then drain in-flight activities and exit."""
+    setup_logging()
+    log = structlog.get_logger().bind(worker=name, pid=os.getpid())
+    if os.getenv("DISABLE_FLAKY") == "1":
+        async def _no_flaky():
+            return
+        stubs.flaky_call = _no_flaky  # type: ignore
+        log.info("flaky_call_disabled_for_demo")
+    metrics.start_metrics_server()
+    client = await Client.connect(
+        config.TEMPORAL_TARGET, runtime=metrics.temporal_runtime(), data_converter=converter.data_converter(),
+    )
+    warmed = await db.warm_up()
+    opts = worker_options()
+    log.info("worker_starting", queue=task_queue, db_pool=db.pool_stats(), db_warmed=warmed, **describe(opts))
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        loop.add_signal_handler(sig, stop.set)
+    try:
+        async with Worker(
+            client,
+            task_queue=task_queue,
+            workflows=list(workflows),
+            activities=list(activities),
+            workflow_runner=workflow_runner(),
+            interceptors=[MetricsInterceptor(), CircuitOpenInterceptor(), EventFlushInterceptor()],
+            graceful_shutdown_timeout=timedelta(seconds=config.WORKER_GRACEFUL_SHUTDOWN_SECS),
+            **opts,
+        ):
+            await stop.wait()
+            log.info("worker_draining", graceful_shutdown_secs=config.WORKER_GRACEFUL_SHUTDOWN_SECS)
+    finally:
+        await store.flush_events()
+        await db.dispose()
+    log.info("worker_stopped", hedging=hedging.stats(), breakers=breaker.stats())
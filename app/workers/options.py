@@ -0,0 +1,46 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+from temporalio.worker import ResourceBasedSlotConfig, WorkerTuner
+
+import app.config as config
+
+def worker_options() -> dict[str, Any]:
+    """Worker(...) keyword arguments from app.config (slots, pollers, cache, executor, tuner)."""
+    opts: dict[str, Any] = {
+        "max_cached_workflows": config.WORKER_MAX_CACHED_WORKFLOWS,
+        "max_concurrent_workflow_task_polls": config.WORKER_WORKFLOW_TASK_POLLERS,
+        "max_concurrent_activity_task_polls": config.WORKER_ACTIVITY_TASK_POLLERS,
+    }
+    if config.WORKER_TUNER == "resource":
+        # Slots grow while CPU/memory stay under target; the fixed limits become the ceiling.
+        opts["tuner"] = WorkerTuner.create_resource_based(
+            target_memory_usage=config.WORKER_TUNER_TARGET_MEMORY,
+            target_cpu_usage=config.WORKER_TUNER_TARGET_CPU,
+            workflow_config=ResourceBasedSlotConfig(minimum_slots=2, maximum_slots=config.WORKER_MAX_CONCURRENT_WORKFLOW_TASKS),
+            activity_config=ResourceBasedSlotConfig(minimum_slots=1, maximum_slots=config.WORKER_MAX_CONCURRENT_ACTIVITIES),
+            local_activity_config=ResourceBasedSlotConfig(minimum_slots=1, maximum_slots=config.WORKER_MAX_CONCURRENT_LOCAL_ACTIVITIES),
+        )
+    else:
+        opts.update(
+            max_concurrent_activities=config.WORKER_MAX_CONCURRENT_ACTIVITIES,
+            max_concurrent_local_activities=config.WORKER_MAX_CONCURRENT_LOCAL_ACTIVITIES,
+            max_concurrent_workflow_tasks=config.WORKER_MAX_CONCURRENT_WORKFLOW_TASKS,
+        )
+    if config.WORKER_ACTIVITY_EXECUTOR_THREADS > 0:
+        opts["activity_executor"] = ThreadPoolExecutor(max_workers=config.WORKER_ACTIVITY_EXECUTOR_THREADS)
+    return opts
+
+def describe(opts: dict[str, Any]) -> dict[str, Any]:
+    """Loggable view of worker_options()."""
+    out = {k: v for k, v in opts.items() if k not in ("tuner", "activity_executor")}
+    out["tuner"] = config.WORKER_TUNER
+    if config.WORKER_TUNER == "resource":
+        out.update(
+            target_cpu=config.WORKER_TUNER_TARGET_CPU,
+            target_memory=config.WORKER_TUNER_TARGET_MEMORY,
+            max_concurrent_activities=config.WORKER_MAX_CONCURRENT_ACTIVITIES,
+            max_concurrent_workflow_tasks=config.WORKER_MAX_CONCURRENT_WORKFLOW_TASKS,
+        )
+    out["activity_executor_threads"] = config.WORKER_ACTIVITY_EXECUTOR_THREADS
+    out["cpu_count"] = config.CPU_COUNT
+    return out
@@ -0,0 +1,135 @@
+"""Run several processes of the order and/or shipping worker on one host.
+
+    python -m app.workers.supervisor --workers order,shipping --procs 4
+
+Each child is a fresh (spawned) interpreter with its own Temporal client and DB
+pool. SIGTERM/SIGINT is forwarded to every child, which drains in-flight
+activities before exiting; children that crash are restarted with backoff.
+"""
+import argparse, asyncio, importlib, multiprocessing, signal, time
+from dataclasses import dataclass
+from multiprocessing.process import BaseProcess
+import structlog
+
+import app.config as config
+from app.logging_setup import setup_logging
+
+WORKER_MODULES = {
+    "order": "app.workers.order_worker",
+    "shipping": "app.workers.shipping_worker",
+}
+# A child that stays up this long is considered healthy again and its backoff resets
+HEALTHY_AFTER_SECS = 60.0
+MAX_RESTART_DELAY_SECS = 30.0
+
+def restart_delay(failures: int) -> float:
+    """Seconds before restarting a child after its `failures`-th consecutive crash: 0.5, 1, 2, ... capped."""
+    return min(MAX_RESTART_DELAY_SECS, 0.5 * 2 ** (failures - 1))
+
+def offset_metrics_ports(index: int) -> None:
+    # One metrics port per child so they don't collide on the host; 0 (disabled) stays 0
+    if config.METRICS_PORT > 0:
+        config.METRICS_PORT += index
+    if config.TEMPORAL_METRICS_PORT > 0:
+        config.TEMPORAL_METRICS_PORT += index
+
+def _child_main(kind: str, index: int) -> None:
+    offset_metrics_ports(index)
+    module = importlib.import_module(WORKER_MODULES[kind])
+    asyncio.run(module.main())
+
+
+@dataclass
+class _Slot:
+    kind: str
+    index: int
+    process: BaseProcess | None = None
+    started_at: float = 0.0
+    failures: int = 0
+    restart_at: float = 0.0
+
+
+class Supervisor:
+    def __init__(self, kinds: list[str], procs: int) -> None:
+        self._ctx = multiprocessing.get_context("spawn")
+        self._slots: list[_Slot] = []
+        index = 0
+        for kind in kinds:
+            for _ in range(procs):
+                self._slots.append(_Slot(kind=kind, index=index))
+                index += 1
+        self._stopping = False
+        self._log = structlog.get_logger().bind(service="supervisor")
+
+    def _start(self, slot: _Slot) -> None:
+        slot.process = self._ctx.Process(
+            target=_child_main, args=(slot.kind, slot.index), name=f"{slot.kind}-worker-{slot.index}",
+        )
+        slot.process.start()
+        slot.started_at = time.monotonic()
+        self._log.info("child_started", kind=slot.kind, index=slot.index, pid=slot.process.pid)
+
+    def _on_signal(self, signum: int, _frame: object) -> None:
+        self._log.info("supervisor_stopping", signal=signal.Signals(signum).name)
+        self._stopping = True
+
+    def _check(self, slot: _Slot) -> None:
+        now = time.monotonic()
+        proc = slot.process
+        if proc is None:
+            if now >= slot.restart_at:
+                self._start(slot)
+            return
+        if proc.is_alive():
+            return
+        if now - slot.started_at >= HEALTHY_AFTER_SECS:
+            slot.failures = 0
+        slot.failures += 1
+        delay = restart_delay(slot.failures)
+        self._log.error("child_exited", kind=slot.kind, index=slot.index, pid=proc.pid,
+                        exitcode=proc.exitcode, restart_in_secs=delay)
+        slot.process = None
+        slot.restart_at = now + delay
+
+    def _shutdown(self) -> None:
+        running = [s.process for s in self._slots if s.process is not None and s.process.is_alive()]
+        for proc in running:
+            proc.terminate()  # SIGTERM: the child drains and exits
+        deadline = time.monotonic() + config.WORKER_GRACEFUL_SHUTDOWN_SECS + 5
+        for proc in running:
+            proc.join(max(0.0, deadline - time.monotonic()))
+        for proc in running:
+            if proc.is_alive():
+                self._log.error("child_killed", pid=proc.pid)
+                proc.kill()
+                proc.join()
+        self._log.info("supervisor_stopped", children=len(running))
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self._on_signal)
+        signal.signal(signal.SIGINT, self._on_signal)
+        self._log.info("supervisor_starting", children=[f"{s.kind}-{s.index}" for s in self._slots])
+        for slot in self._slots:
+            self._start(slot)
+        while not self._stopping:
+            for slot in self._slots:
+                self._check(slot)
+            time.sleep(0.5)
+        self._shutdown()
+
+
+def main(argv: list[str] | None = None) -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--workers", default="order,shipping", help="comma-separated: order, shipping")
+    p.add_argument("--procs", type=int, default=config.WORKER_PROCS, help="processes per worker type")
+    args = p.parse_args(argv)
+    kinds = [k.strip() for k in args.workers.split(",") if k.strip()]
+    unknown = [k for k in kinds if k not in WORKER_MODULES]
+    if unknown:
+        p.error(f"unknown worker type(s): {', '.join(unknown)}")
+    setup_logging()
+    Supervisor(kinds, max(1, args.procs)).run()
+
+
+if __name__ == "__main__":
+    main()
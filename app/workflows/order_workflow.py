@@ -1,13 +1,21 @@
 from __future__ import annotations
+import asyncio
 from dataclasses import dataclass
 from datetime import timedelta
 from temporalio import workflow
-from typing import Optional
+from temporalio.common import SearchAttributeKey
+from typing import Any, Optional
 
 import app.config as config
-from app.activities import order_activities
 from app.workflows.shipping_workflow import ShippingWorkflow
 
+# Activities are called by registered name: importing their modules would drag the DB,
+# logging and stub clients into every sandboxed run (see app/workflows/sandbox.py).
+
+# Keyword search attribute mirroring current_step, so bulk endpoints can select orders with a
+# visibility query. Must be registered on the namespace; only upserted when the input opts in.
+ORDER_STEP = SearchAttributeKey.for_keyword("OrderStep")
+
 
 @dataclass
 class OrderState:
@@ -27,22 +35,79 @@ class OrderWorkflow:
     def __init__(self) -> None:
         self.state: Optional[OrderState] = None
         self._dispatch_failed_reason: Optional[str] = None
+        self._local_bookkeeping = False
+        self._index_step = False
+        self._address_dirty = False
+        self._address_lock = asyncio.Lock()
+        self._address_writer: Optional[asyncio.Task] = None
+        self._inline_shipping = False
+
+    def _set_step(self, step: str) -> None:
+        assert self.state
+        self.state.current_step = step
+        if self._index_step:
+            workflow.upsert_search_attributes([ORDER_STEP.value_set(step)])
+
+    def _bookkeeping(self, activity: str, *args: Any):
+        """Start a small DB write as a local or remote activity, per the order's bookkeeping mode."""
+        if self._local_bookkeeping:
+            return workflow.start_local_activity(activity, args=list(args), **config.LOCAL_ACTIVITY_KWARGS)
+        return workflow.start_activity(activity, args=list(args), **config.activity_options(activity))
+
+    async def _ship_inline(self, order: dict) -> None:
+        """ShippingWorkflow's steps as activities of this workflow, on orders-tq."""
+        await workflow.execute_activity("prepare_package", args=[order], **config.activity_options("prepare_package"))
+        try:
+            await workflow.execute_activity("dispatch_carrier", args=[order], **config.activity_options("dispatch_carrier"))
+        except Exception as e:
+            # What the child reports through the dispatch_failed signal
+            self._dispatch_failed_reason = str(e)
+            if self.state:
+                self.state.last_error = str(e)
+            raise
 
     @workflow.signal
     def cancel(self) -> None:
         if self.state:
             self.state.cancelled = True
 
+    async def _flush_address(self) -> None:
+        """Persist the latest signalled address if it hasn't been written yet."""
+        async with self._address_lock:
+            if not self._address_dirty or self.state is None:
+                return
+            self._address_dirty = False
+            try:
+                await self._bookkeeping("update_order_address", self.state.order_id, self.state.address)
+            except Exception as e:
+                # Same outcome as the old fire-and-forget write: logged, not fatal to the order
+                workflow.logger.warning("update_order_address failed: %s", e)
+
+    async def _write_address_after_quiet_window(self) -> None:
+        while True:
+            await workflow.wait_condition(lambda: self._address_dirty)
+            try:
+                # One timer per burst; an explicit flush (which clears the flag) ends it early
+                await workflow.wait_condition(
+                    lambda: not self._address_dirty,
+                    timeout=timedelta(milliseconds=config.ADDRESS_DEBOUNCE_MS),
+                )
+            except asyncio.TimeoutError:
+                pass
+            await self._flush_address()
+
     @workflow.signal
     def update_address(self, address: dict) -> None:
-        if self.state:
-            self.state.address = address
-            workflow.start_activity(
-                order_activities.update_order_address,
-                self.state.order_id,
-                address,
-                **config.ACTIVITY_KWARGS,
-            )
+        if not self.state:
+            return
+        self.state.address = address
+        if not workflow.patched("coalesce-address-updates"):
+            # Pre-patch histories wrote every update immediately; keep it so they replay.
+            self._bookkeeping("update_order_address", self.state.order_id, address)
+            return
+        self._address_dirty = True
+        if self._address_writer is None:
+            self._address_writer = asyncio.create_task(self._write_address_after_quiet_window())
 
     @workflow.signal
     def approve(self) -> None:
@@ -74,96 +139,108 @@ class OrderWorkflow:
         order_id: str = inputs["order_id"]
         payment_id: str = inputs["payment_id"]
         address: dict = inputs.get("address") or {}
+        self._local_bookkeeping = inputs.get("bookkeeping") == "local"
+        self._index_step = bool(inputs.get("index_step"))
+        self._inline_shipping = inputs.get("shipping") == "inline"
 
         self.state = OrderState(order_id=order_id, address=address)
-        self.state.current_step = "receive_order"
+        self._set_step("receive_order")
 
         order = await workflow.execute_activity(
-            order_activities.receive_order,
+            "receive_order",
             args=[order_id, address],
-            **config.ACTIVITY_KWARGS,
+            **config.activity_options("receive_order"),
         )
 
-        self.state.current_step = "validate_order"
+        self._set_step("validate_order")
         await workflow.execute_activity(
-            order_activities.validate_order,
+            "validate_order",
             args=[order],
-            **config.ACTIVITY_KWARGS,
+            **config.activity_options("validate_order"),
         )
         self.state.validated = True
 
-        # Manual review wait: poll for approval up to MANUAL_REVIEW_SECS
-        self.state.current_step = "manual_review"
-        end_time = workflow.now() + timedelta(seconds=config.MANUAL_REVIEW_SECS)
-        while not self.state.approved and workflow.now() < end_time:
-            await workflow.sleep(timedelta(milliseconds=100))
+        # Manual review wait: up to MANUAL_REVIEW_SECS, woken early by approve/cancel
+        self._set_step("manual_review")
+        state = self.state
+        if workflow.patched("manual-review-wait-condition"):
+            try:
+                await workflow.wait_condition(
+                    lambda: state.approved or state.cancelled,
+                    timeout=timedelta(seconds=config.MANUAL_REVIEW_SECS),
+                )
+            except asyncio.TimeoutError:
+                pass
+        else:
+            # Pre-patch histories polled with 100 ms timers; keep it so they replay.
+            end_time = workflow.now() + timedelta(seconds=config.MANUAL_REVIEW_SECS)
+            while not state.approved and workflow.now() < end_time:
+                await workflow.sleep(timedelta(milliseconds=100))
 
         if self.state.cancelled:
-            self.state.current_step = "cancelled"
-            await workflow.execute_activity(
-                order_activities.set_order_state,
-                args=[order_id, "cancelled"],
-                **config.ACTIVITY_KWARGS,
-            )
+            self._set_step("cancelled")
+            await self._flush_address()
+            await self._bookkeeping("set_order_state", order_id, "cancelled")
             return {"status": "cancelled"}
 
-        self.state.current_step = "charge_payment"
+        self._set_step("charge_payment")
         pay = await workflow.execute_activity(
-            order_activities.charge_payment,
+            "charge_payment",
             args=[order, payment_id],
-            **config.ACTIVITY_KWARGS,
+            **config.activity_options("charge_payment"),
         )
         self.state.payment_status = pay.get("status")
 
         if self.state.cancelled:
-            self.state.current_step = "cancelled"
-            await workflow.execute_activity(
-                order_activities.set_order_state,
-                args=[order_id, "cancelled"],
-                **config.ACTIVITY_KWARGS,
-            )
+            self._set_step("cancelled")
+            await self._flush_address()
+            await self._bookkeeping("set_order_state", order_id, "cancelled")
             return {"status": "cancelled"}
 
+        # Shipping uses the stored address, so write any pending update first
+        await self._flush_address()
+
         # Start shipping child workflow and handle retry on dispatch failure
         max_attempts = 2
         while self.state.shipping_attempts < max_attempts:
             self.state.shipping_attempts += 1
-            self.state.current_step = f"shipping_attempt_{self.state.shipping_attempts}"
+            self._set_step(f"shipping_attempt_{self.state.shipping_attempts}")
             self._dispatch_failed_reason = None
 
-            handle = await workflow.start_child_workflow(
-                ShippingWorkflow.run,
-                {"order": order},
-                id=f"ship-{order_id}-{self.state.shipping_attempts}",
-                task_queue=config.SHIPPING_TQ,
-                run_timeout=timedelta(seconds=config.CHILD_RUN_TIMEOUT_SECS),
-            )
+            if self._inline_shipping:
+                attempt = self._ship_inline(order)
+            else:
+                handle = await workflow.start_child_workflow(
+                    ShippingWorkflow.run,
+                    {"order": order},
+                    id=f"ship-{order_id}-{self.state.shipping_attempts}",
+                    task_queue=config.SHIPPING_TQ,
+                    run_timeout=timedelta(seconds=config.CHILD_RUN_TIMEOUT_SECS),
+                )
+                attempt = handle.result()
 
             try:
-                await handle.result()
+                await attempt
                 break
             except Exception as e:
                 self.state.last_error = str(e)
-                await workflow.execute_activity(
-                    order_activities.append_event,
-                    args=[order_id, "dispatch_failed", {"reason": self._dispatch_failed_reason or str(e)}],
-                    **config.ACTIVITY_KWARGS,
+                await self._bookkeeping(
+                    "append_event",
+                    order_id, "dispatch_failed", {"reason": self._dispatch_failed_reason or str(e)},
                 )
                 if self.state.shipping_attempts >= max_attempts or self.state.cancelled:
-                    await workflow.execute_activity(
-                        order_activities.set_order_state,
-                        args=[order_id, "shipping_failed"],
-                        **config.ACTIVITY_KWARGS,
-                    )
-                    self.state.current_step = "shipping_failed"
+                    await self._flush_address()
+                    await self._bookkeeping("set_order_state", order_id, "shipping_failed")
+                    self._set_step("shipping_failed")
                     return {"status": "shipping_failed", "reason": self._dispatch_failed_reason or str(e)}
 
-        self.state.current_step = "order_shipped"
+        self._set_step("order_shipped")
         await workflow.execute_activity(
-            order_activities.mark_order_shipped,
+            "mark_order_shipped",
             args=[order],
-            **config.ACTIVITY_KWARGS,
+            **config.activity_options("mark_order_shipped"),
         )
+        await self._flush_address()
         return {"status": "shipped"}
 
 
@@ -0,0 +1,28 @@
+"""Sandbox settings shared by the workers.
+
+The sandbox re-imports every non-passthrough module for each workflow run (new
+runs and cache-miss replays alike), so anything the workflow modules import
+should be deterministic at import time and cheap, or passed through.
+"""
+from temporalio.worker.workflow_sandbox import SandboxedWorkflowRunner, SandboxRestrictions
+
+# Loaded once per process and shared with workflow code instead of re-imported per run.
+# app.config only reads env vars and builds retry policies. The rest are activity-side
+# libraries the workflow modules no longer import; passing them through keeps an
+# accidental transitive import from costing a re-import on every run.
+PASSTHROUGH_MODULES = (
+    "app.config",
+    "structlog",
+    "sqlalchemy",
+    "asyncpg",
+    "orjson",
+    "prometheus_client",
+)
+
+
+def workflow_runner(passthrough: bool = True) -> SandboxedWorkflowRunner:
+    if not passthrough:
+        return SandboxedWorkflowRunner()
+    return SandboxedWorkflowRunner(
+        restrictions=SandboxRestrictions.default.with_passthrough_modules(*PASSTHROUGH_MODULES),
+    )
@@ -2,7 +2,6 @@ from __future__ import annotations
 from typing import Any
 from temporalio import workflow
 import app.config as config
-from app.activities import shipping_activities
 
 @workflow.defn
 class ShippingWorkflow:
@@ -11,16 +10,16 @@ class ShippingWorkflow:
         order: dict = inputs["order"]
 
         await workflow.execute_activity(
-            shipping_activities.prepare_package,
+            "prepare_package",
             args=[order],
-            **config.ACTIVITY_KWARGS,
+            **config.activity_options("prepare_package"),
         )
 
         try:
             await workflow.execute_activity(
-                shipping_activities.dispatch_carrier,
+                "dispatch_carrier",
                 args=[order],
-                **config.ACTIVITY_KWARGS,
+                **config.activity_options("dispatch_carrier"),
             )
         except Exception as e:
             if workflow.info().parent_workflow_id:
@@ -0,0 +1,57 @@
+"""Run the pipeline benchmark once per value of one option and summarise side by side.
+
+    python -m bench.compare --vary bookkeeping=remote,local --orders 200 --dispatch-failures 0.2
+
+Every other flag is passed to bench.pipeline unchanged. The report keeps each
+run's full output under "runs" and a compact table under "summary".
+"""
+import argparse, asyncio, dataclasses
+from typing import Any
+
+from bench.pipeline import BenchOptions, parse_args, run, write_report
+
+
+def _variants(base: BenchOptions, vary: str) -> list[BenchOptions]:
+    key, _, values = vary.partition("=")
+    fields = {f.name: f for f in dataclasses.fields(BenchOptions)}
+    if key not in fields or not values:
+        raise SystemExit(f"--vary expects <option>=<v1>,<v2>,... with option one of: {', '.join(fields)}")
+    cast = type(getattr(base, key))
+    if cast is bool:
+        cast = lambda v: v.lower() in ("1", "true", "yes")  # noqa: E731
+    return [dataclasses.replace(base, **{key: cast(v)}, label=f"{key}={v}") for v in values.split(",")]
+
+
+def summarise(report: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "label": report["label"],
+        "statuses": report["statuses"],
+        "orders_per_sec": report["orders_per_sec"],
+        "e2e_p50_ms": report["e2e_ms"].get("p50"),
+        "e2e_p95_ms": report["e2e_ms"].get("p95"),
+        "workflow_task_p50_ms": report["workflow_task_ms"].get("p50"),
+        "workflow_task_p95_ms": report["workflow_task_ms"].get("p95"),
+        "history_events_order_mean": report["history_events"]["order"].get("mean"),
+        "history_events_shipping_mean": report["history_events"]["shipping"].get("mean"),
+        "history_events_total_mean": report["history_events"]["total"].get("mean"),
+        "history_bytes_mean": report["history_bytes"].get("mean"),
+        "db_statements_per_order": report["db_statements_per_order"],
+    }
+
+
+async def compare(variants: list[BenchOptions]) -> dict[str, Any]:
+    # Sequential on purpose: concurrent runs would compete for the same CPU
+    runs = [await run(opts) for opts in variants]
+    return {"summary": [summarise(r) for r in runs], "runs": runs}
+
+
+def main(argv: list[str] | None = None) -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--vary", required=True, help="option=value1,value2,... (e.g. bookkeeping=remote,local)")
+    args, rest = p.parse_known_args(argv)
+    base, out = parse_args(rest)
+    write_report(asyncio.run(compare(_variants(base, args.vary))), out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,348 @@
+"""End-to-end benchmark for the order pipeline.
+
+Runs OrderWorkflow + ShippingWorkflow with both workers in-process against a
+Temporal test server, a local dev server or an existing cluster, drives N
+orders with bounded concurrency and prints a JSON report:
+
+    python -m bench.pipeline --orders 200 --concurrency 50 --out bench_output.json
+
+By default `store` talks to an in-memory stand-in for Postgres (statements are
+counted and delayed by --db-latency-ms); --db postgres uses DATABASE_URL.
+"""
+import argparse, asyncio, json, math, sys, time, uuid, zlib
+from collections import Counter
+from dataclasses import asdict, dataclass
+from datetime import timedelta
+from typing import Any
+
+import temporalio
+from temporalio import activity
+from temporalio.api.enums.v1 import EventType
+from temporalio.client import Client
+from temporalio.exceptions import ApplicationError
+from temporalio.runtime import BUFFERED_METRIC_KIND_HISTOGRAM, MetricBuffer, Runtime, TelemetryConfig
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import ActivityInboundInterceptor, ExecuteActivityInput, Interceptor, Worker
+
+import app.config as config
+from app import converter, db
+from app.activities.interceptors import CircuitOpenInterceptor, EventFlushInterceptor
+from app.concurrency import bounded_map
+from app.domain import breaker, hedging, store, stubs
+from app.workers import order_worker, shipping_worker
+from app.workflows.order_workflow import OrderWorkflow
+from app.workflows.sandbox import workflow_runner
+from app.workflows.shipping_workflow import ShippingWorkflow
+
+
+@dataclass
+class BenchOptions:
+    orders: int = 100
+    concurrency: int = 50
+    env: str = "time-skipping"  # time-skipping | local | existing
+    target: str = config.TEMPORAL_TARGET
+    db: str = "memory"  # memory | postgres
+    db_latency_ms: float = 1.0
+    flaky: bool = False
+    bookkeeping: str = config.BOOKKEEPING_MODE  # remote | local
+    shipping: str = config.SHIPPING_MODE  # child | inline
+    dispatch_failures: float = 0.0  # fraction of orders whose carrier dispatch always fails
+    payload_converter: str = config.PAYLOAD_CONVERTER  # json | orjson
+    compress_min_bytes: int = config.PAYLOAD_COMPRESS_MIN_BYTES
+    hedge_calls: str = config.HEDGE_CALLS  # stub names to hedge, e.g. carrier_dispatched,package_prepared
+    sandbox_passthrough: bool = True  # the workers' passthrough config, or default sandbox restrictions
+    label: str = ""
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {"count": 0}
+    s = sorted(values)
+
+    def pct(p: float) -> float:
+        return round(s[max(0, math.ceil(p / 100 * len(s)) - 1)], 3)
+
+    return {"count": len(s), "p50": pct(50), "p95": pct(95), "p99": pct(99), "max": round(s[-1], 3)}
+
+
+class StatementCounter:
+    """Wraps db.execute/fetchone/fetchall to count statements; in memory mode nothing reaches Postgres."""
+
+    def __init__(self, memory: bool, latency_ms: float) -> None:
+        self.memory = memory
+        self.latency = latency_ms / 1000
+        self.count = 0
+        self.by_statement: Counter[str] = Counter()
+        self._saved: tuple | None = None
+
+    async def _record(self, sql: str) -> None:
+        self.count += 1
+        self.by_statement[" ".join(sql.split())[:80]] += 1
+        if self.memory and self.latency:
+            await asyncio.sleep(self.latency)
+
+    def install(self) -> None:
+        self._saved = (db.execute, db.fetchone, db.fetchall)
+        real_execute, real_fetchone, real_fetchall = self._saved
+
+        async def execute(sql: str, params: dict | None = None, **kwargs: Any) -> None:
+            await self._record(sql)
+            if not self.memory:
+                await real_execute(sql, params, **kwargs)
+
+        async def fetchone(sql: str, params: dict | None = None, **kwargs: Any) -> dict | None:
+            await self._record(sql)
+            return None if self.memory else await real_fetchone(sql, params, **kwargs)
+
+        async def fetchall(sql: str, params: dict | None = None, **kwargs: Any) -> list[dict[str, Any]]:
+            await self._record(sql)
+            return [] if self.memory else await real_fetchall(sql, params, **kwargs)
+
+        db.execute, db.fetchone, db.fetchall = execute, fetchone, fetchall  # type: ignore[assignment]
+
+    def uninstall(self) -> None:
+        if self._saved is not None:
+            db.execute, db.fetchone, db.fetchall = self._saved  # type: ignore[assignment]
+            self._saved = None
+
+
+class ActivityTimer(Interceptor):
+    def __init__(self) -> None:
+        self.samples: dict[str, list[float]] = {}
+
+    def intercept_activity(self, next: ActivityInboundInterceptor) -> ActivityInboundInterceptor:
+        return _TimedActivityInbound(next, self)
+
+
+class _TimedActivityInbound(ActivityInboundInterceptor):
+    def __init__(self, next: ActivityInboundInterceptor, timer: ActivityTimer) -> None:
+        super().__init__(next)
+        self._timer = timer
+
+    async def execute_activity(self, input: ExecuteActivityInput) -> Any:
+        started = time.perf_counter()
+        try:
+            return await super().execute_activity(input)
+        finally:
+            name = activity.info().activity_type
+            self._timer.samples.setdefault(name, []).append((time.perf_counter() - started) * 1000)
+
+
+class SdkMetrics:
+    """Drains the runtime's MetricBuffer and keeps histogram samples by metric name."""
+
+    def __init__(self) -> None:
+        self.buffer = MetricBuffer(100_000)
+        self.runtime = Runtime(telemetry=TelemetryConfig(metrics=self.buffer))
+        self.histograms: dict[str, list[float]] = {}
+        self._task: asyncio.Task | None = None
+
+    def drain(self) -> None:
+        for update in self.buffer.retrieve_updates():
+            if update.metric.kind == BUFFERED_METRIC_KIND_HISTOGRAM:
+                self.histograms.setdefault(update.metric.name, []).append(float(update.value))
+
+    async def _poll(self) -> None:
+        while True:
+            await asyncio.sleep(0.2)
+            self.drain()
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._poll())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+        self.drain()
+
+    def histogram(self, suffix: str) -> list[float]:
+        return [v for name, vals in self.histograms.items() if name.endswith(suffix) for v in vals]
+
+
+async def _environment(opts: BenchOptions, runtime: Runtime) -> WorkflowEnvironment:
+    data_converter = converter.data_converter(opts.payload_converter, opts.compress_min_bytes)
+    if opts.env == "local":
+        return await WorkflowEnvironment.start_local(runtime=runtime, data_converter=data_converter)
+    if opts.env == "existing":
+        client = await Client.connect(opts.target, runtime=runtime, data_converter=data_converter)
+        return WorkflowEnvironment.from_client(client)
+    return await WorkflowEnvironment.start_time_skipping(runtime=runtime, data_converter=data_converter)
+
+
+def workflow_input(opts: BenchOptions, order_id: str) -> dict:
+    return {
+        "order_id": order_id,
+        "payment_id": f"pay-{order_id}",
+        "address": {"line1": "1 Bench St"},
+        "bookkeeping": opts.bookkeeping,
+        "shipping": opts.shipping,
+    }
+
+
+async def _run_order(client: Client, opts: BenchOptions, order_id: str) -> dict[str, Any]:
+    started = time.perf_counter()
+    handle = await client.start_workflow(
+        OrderWorkflow.run,
+        workflow_input(opts, order_id),
+        id=f"order-{order_id}",
+        task_queue=config.ORDERS_TQ,
+        run_timeout=timedelta(seconds=config.RUN_TIMEOUT_SECS),
+    )
+    await handle.signal(OrderWorkflow.approve)
+    try:
+        status = (await handle.result())["status"]
+    except Exception:
+        status = "failed"
+    return {"workflow_id": handle.id, "status": status, "e2e_ms": (time.perf_counter() - started) * 1000}
+
+
+async def _history_lengths(client: Client, workflow_id: str) -> dict[str, Any]:
+    history = await client.get_workflow_handle(workflow_id).fetch_history()
+    children = [
+        e.child_workflow_execution_started_event_attributes.workflow_execution.workflow_id
+        for e in history.events
+        if e.event_type == EventType.EVENT_TYPE_CHILD_WORKFLOW_EXECUTION_STARTED
+    ]
+    child_histories = [await client.get_workflow_handle(c).fetch_history() for c in children]
+    return {
+        "order": len(history.events),
+        "shipping": [len(h.events) for h in child_histories],
+        "total": len(history.events) + sum(len(h.events) for h in child_histories),
+        "bytes": sum(e.ByteSize() for h in [history, *child_histories] for e in h.events),
+    }
+
+
+def _mean_max(values: list[int]) -> dict[str, float]:
+    if not values:
+        return {"count": 0}
+    return {"count": len(values), "mean": round(sum(values) / len(values), 2), "max": max(values)}
+
+
+def _failing_dispatch(rate: float):
+    real = stubs.carrier_dispatched
+
+    async def carrier_dispatched(order: dict) -> str:
+        # Same orders fail on every attempt, so both shipping attempts and the failure bookkeeping run
+        if zlib.crc32(order["order_id"].encode()) % 1000 < rate * 1000:
+            raise ApplicationError("carrier rejected (bench)", non_retryable=True)
+        return await real(order)
+    return carrier_dispatched
+
+
+async def run(opts: BenchOptions) -> dict[str, Any]:
+    saved_flaky, saved_dispatch, saved_hedge = stubs.flaky_call, stubs.carrier_dispatched, config.HEDGE_CALLS
+    config.HEDGE_CALLS = opts.hedge_calls
+    hedging.reset()
+    breaker.reset()
+    if not opts.flaky:
+        async def no_flaky() -> None:
+            return
+        stubs.flaky_call = no_flaky  # type: ignore[assignment]
+    if opts.dispatch_failures > 0:
+        stubs.carrier_dispatched = _failing_dispatch(opts.dispatch_failures)  # type: ignore[assignment]
+    counter = StatementCounter(memory=opts.db == "memory", latency_ms=opts.db_latency_ms)
+    counter.install()
+    sdk = SdkMetrics()
+    timer = ActivityTimer()
+    interceptors = [timer, CircuitOpenInterceptor(), EventFlushInterceptor()]
+    runner = workflow_runner(opts.sandbox_passthrough)
+    run_tag = uuid.uuid4().hex[:8]
+    try:
+        async with await _environment(opts, sdk.runtime) as env:
+            sdk.start()
+            client = env.client
+            async with Worker(client, task_queue=config.ORDERS_TQ, workflows=[OrderWorkflow], workflow_runner=runner,
+                              activities=order_worker.ACTIVITIES, interceptors=interceptors), \
+                       Worker(client, task_queue=config.SHIPPING_TQ, workflows=[ShippingWorkflow], workflow_runner=runner,
+                              activities=shipping_worker.ACTIVITIES, interceptors=interceptors):
+                order_ids = [f"bench-{run_tag}-{i}" for i in range(opts.orders)]
+                started = time.perf_counter()
+                results = await bounded_map(lambda oid: _run_order(client, opts, oid), order_ids, opts.concurrency)
+                elapsed = time.perf_counter() - started
+                await store.flush_events()
+                statements = counter.count
+                histories = await bounded_map(lambda r: _history_lengths(client, r["workflow_id"]), results, 20)
+    finally:
+        sdk.stop()
+        counter.uninstall()
+        stubs.flaky_call, stubs.carrier_dispatched = saved_flaky, saved_dispatch  # type: ignore[assignment]
+        config.HEDGE_CALLS = saved_hedge
+
+    return {
+        "label": opts.label,
+        "options": asdict(opts),
+        "temporalio": temporalio.__version__,
+        "orders": opts.orders,
+        "statuses": dict(Counter(r["status"] for r in results)),
+        "elapsed_s": round(elapsed, 3),
+        "orders_per_sec": round(opts.orders / elapsed, 2) if elapsed else None,
+        "e2e_ms": percentiles([r["e2e_ms"] for r in results]),
+        "activity_ms": {name: percentiles(vals) for name, vals in sorted(timer.samples.items())},
+        "workflow_task_ms": percentiles(sdk.histogram("workflow_task_execution_latency")),
+        "workflow_task_schedule_to_start_ms": percentiles(sdk.histogram("workflow_task_schedule_to_start_latency")),
+        "hedging": hedging.stats(),
+        "circuit_breakers": breaker.stats(),
+        "db_statements_per_order": round(statements / opts.orders, 2) if opts.orders else 0,
+        "db_statements": dict(counter.by_statement.most_common()),
+        "history_events": {
+            "order": _mean_max([h["order"] for h in histories]),
+            "shipping": _mean_max([n for h in histories for n in h["shipping"]]),
+            # order + its shipping children: comparable across --shipping modes
+            "total": _mean_max([h["total"] for h in histories]),
+        },
+        # Serialized history size per order, child workflows included
+        "history_bytes": _mean_max([h["bytes"] for h in histories]),
+    }
+
+
+def parse_args(argv: list[str] | None = None) -> tuple[BenchOptions, str | None]:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--orders", type=int, default=BenchOptions.orders)
+    p.add_argument("--concurrency", type=int, default=BenchOptions.concurrency)
+    p.add_argument("--env", choices=["time-skipping", "local", "existing"], default=BenchOptions.env)
+    p.add_argument("--target", default=BenchOptions.target, help="server address for --env existing")
+    p.add_argument("--db", choices=["memory", "postgres"], default=BenchOptions.db)
+    p.add_argument("--db-latency-ms", type=float, default=BenchOptions.db_latency_ms)
+    p.add_argument("--flaky", action="store_true", help="keep stubs.flaky_call failures/hangs")
+    p.add_argument("--bookkeeping", choices=["remote", "local"], default=BenchOptions.bookkeeping,
+                   help="run set_order_state/append_event/update_order_address as remote or local activities")
+    p.add_argument("--shipping", choices=["child", "inline"], default=BenchOptions.shipping,
+                   help="ShippingWorkflow child per attempt, or shipping activities run by OrderWorkflow")
+    p.add_argument("--dispatch-failures", type=float, default=BenchOptions.dispatch_failures,
+                   help="fraction of orders (0-1) whose carrier dispatch fails, exercising the failure path")
+    p.add_argument("--payload-converter", choices=["json", "orjson"], default=BenchOptions.payload_converter)
+    p.add_argument("--compress-min-bytes", type=int, default=BenchOptions.compress_min_bytes,
+                   help="zlib-compress payloads at least this large (0 = off)")
+    p.add_argument("--hedge", dest="hedge_calls", default=BenchOptions.hedge_calls,
+                   help="comma-separated stubs to hedge: payment_charged,package_prepared,carrier_dispatched")
+    p.add_argument("--no-sandbox-passthrough", dest="sandbox_passthrough", action="store_false",
+                   help="run workflows under the default sandbox restrictions instead of the workers' passthrough list")
+    p.add_argument("--label", default="")
+    p.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = p.parse_args(argv)
+    opts = BenchOptions(
+        orders=args.orders, concurrency=args.concurrency, env=args.env, target=args.target,
+        db=args.db, db_latency_ms=args.db_latency_ms, flaky=args.flaky,
+        bookkeeping=args.bookkeeping, shipping=args.shipping, dispatch_failures=args.dispatch_failures,
+        payload_converter=args.payload_converter, compress_min_bytes=args.compress_min_bytes,
+        hedge_calls=args.hedge_calls, sandbox_passthrough=args.sandbox_passthrough, label=args.label,
+    )
+    return opts, args.out
+
+
+def write_report(report: Any, out: str | None) -> None:
+    text = json.dumps(report, indent=2, sort_keys=False)
+    if out:
+        with open(out, "w") as f:
+            f.write(text + "\n")
+    else:
+        sys.stdout.write(text + "\n")
+
+
+def main(argv: list[str] | None = None) -> None:
+    opts, out = parse_args(argv)
+    write_report(asyncio.run(run(opts)), out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Cost of loading the workflow modules into a fresh workflow sandbox.
+
+The sandbox repeats this import work for every workflow run it starts (new runs
+and cache-miss replays), so it is a floor on the first workflow task's latency:
+
+    python -m bench.sandbox --rounds 20
+
+Reports milliseconds per load for the default restrictions and for the
+workers' passthrough config (app.workflows.sandbox). End-to-end workflow task
+latency is in bench.pipeline's report as workflow_task_ms; compare with
+`python -m bench.compare --vary sandbox_passthrough=false,true`.
+"""
+import argparse, asyncio, time
+from typing import Any
+
+from temporalio import workflow
+
+from app.workflows.order_workflow import OrderWorkflow
+from app.workflows.sandbox import workflow_runner
+from app.workflows.shipping_workflow import ShippingWorkflow
+from bench.pipeline import percentiles, write_report
+
+
+async def measure(rounds: int) -> dict[str, Any]:
+    report: dict[str, Any] = {}
+    for passthrough in (False, True):
+        runner = workflow_runner(passthrough)
+        key = "passthrough" if passthrough else "default"
+        report[key] = {}
+        for wf in (OrderWorkflow, ShippingWorkflow):
+            defn = workflow._Definition.must_from_class(wf)
+            samples = []
+            for _ in range(rounds):
+                # prepare_workflow instantiates (needs a running loop) the workflow in a new sandbox, importing its module
+                started = time.perf_counter()
+                runner.prepare_workflow(defn)
+                samples.append((time.perf_counter() - started) * 1000)
+            report[key][wf.__name__] = percentiles(samples)
+    return report
+
+
+def main(argv: list[str] | None = None) -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    p.add_argument("--rounds", type=int, default=20)
+    p.add_argument("--out", help="write the JSON report here instead of stdout")
+    args = p.parse_args(argv)
+    write_report(asyncio.run(measure(args.rounds)), args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import asyncio, dataclasses, time
+from datetime import timedelta
+
+import pytest
+from temporalio.exceptions import ApplicationError
+from temporalio.testing import ActivityEnvironment
+
+import app.config as config
+from app.activities import shipping_activities
+from app.activities.heartbeat import heartbeating
+from app.domain import store, stubs
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture(autouse=True)
+def short_call_timeout(monkeypatch):
+    profile = dataclasses.replace(config.ACTIVITY_PROFILES["downstream"], call_timeout=timedelta(milliseconds=200))
+    monkeypatch.setitem(config.ACTIVITY_PROFILES, "downstream", profile)
+
+def environment(activity_type: str, heartbeat_ms: int = 90) -> tuple[ActivityEnvironment, list]:
+    env = ActivityEnvironment()
+    env.info = dataclasses.replace(
+        env.info, activity_type=activity_type, heartbeat_timeout=timedelta(milliseconds=heartbeat_ms),
+    )
+    beats: list = []
+    env.on_heartbeat = lambda *details: beats.append(details)
+    return env, beats
+
+@pytest.fixture
+def ledger(monkeypatch):
+    async def no_result(*key):
+        return None
+
+    async def record(wf, run, act, type_, result):
+        return result
+    monkeypatch.setattr(store, "get_activity_result", no_result)
+    monkeypatch.setattr(store, "record_activity_result", record)
+
+async def test_hung_downstream_call_fails_after_call_timeout(monkeypatch, ledger):
+    cancelled = asyncio.Event()
+    writes = []
+
+    async def hang() -> None:
+        try:
+            await asyncio.sleep(300)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def append_event(*args):
+        writes.append(args)
+    monkeypatch.setattr(stubs, "flaky_call", hang)
+    monkeypatch.setattr(store, "append_event", append_event)
+
+    env, beats = environment("dispatch_carrier")
+    started = time.monotonic()
+    with pytest.raises(ApplicationError) as err:
+        await env.run(shipping_activities.dispatch_carrier, {"order_id": "ord_hang"})
+    assert err.value.type == "CallTimeout"
+    assert time.monotonic() - started < 1.0
+    assert beats
+    assert writes == []
+    await asyncio.wait_for(cancelled.wait(), 1)
+
+async def test_slow_store_write_in_stub_is_not_bounded_by_call_timeout(monkeypatch, ledger):
+    async def no_flaky() -> None:
+        return
+
+    writes = []
+
+    async def slow_append_event(order_id, type_, payload):
+        await asyncio.sleep(0.3)  # slower than call_timeout (0.2 s), e.g. a NullPool connect
+        writes.append(type_)
+    monkeypatch.setattr(stubs, "flaky_call", no_flaky)
+    monkeypatch.setattr(store, "append_event", slow_append_event)
+
+    env, beats = environment("dispatch_carrier")
+    assert await env.run(shipping_activities.dispatch_carrier, {"order_id": "ord_slow_write"}) == "Dispatched"
+    assert writes == ["carrier_dispatched"]
+    assert beats
+
+async def test_slow_call_heartbeats_and_returns():
+    @heartbeating
+    async def prepare_package() -> str:
+        await asyncio.sleep(0.12)
+        return "Package ready"
+
+    env, beats = environment("prepare_package")
+    assert await env.run(prepare_package) == "Package ready"
+    assert len(beats) >= 2
+
+async def test_ledger_write_is_heartbeated_and_not_bounded_by_call_timeout(monkeypatch):
+    async def carrier_dispatched(order):
+        return "Dispatched"
+
+    async def no_result(*key):
+        return None
+
+    async def slow_record(wf, run, act, type_, result):
+        await asyncio.sleep(0.3)  # slower than call_timeout (0.2 s), e.g. a slow connection checkout
+        return result
+    monkeypatch.setattr(stubs, "carrier_dispatched", carrier_dispatched)
+    monkeypatch.setattr(store, "get_activity_result", no_result)
+    monkeypatch.setattr(store, "record_activity_result", slow_record)
+
+    env, beats = environment("dispatch_carrier")
+    assert await env.run(shipping_activities.dispatch_carrier, {"order_id": "ord_hb"}) == "Dispatched"
+    assert len(beats) >= 3
+
+async def test_profiles_by_activity_name():
+    assert config.activity_profile("charge_payment") is config.ACTIVITY_PROFILES["payment"]
+    assert "heartbeat_timeout" not in config.activity_options("append_event")
+    assert config.activity_options("receive_order")["heartbeat_timeout"] == timedelta(
+        milliseconds=config.ACTIVITY_HEARTBEAT_TIMEOUT_MS,
+    )
@@ -0,0 +1,33 @@
+import dataclasses
+import pytest
+from temporalio.testing import ActivityEnvironment
+
+from app.activities import shipping_activities
+from app.domain import stubs, store
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture
+def ledger(monkeypatch):
+    rows: dict = {}
+    async def get_activity_result(wf, run, act):
+        return {"result_json": rows[(wf, run, act)]} if (wf, run, act) in rows else None
+    async def record_activity_result(wf, run, act, type_, result):
+        return rows.setdefault((wf, run, act), result)
+    monkeypatch.setattr(store, "get_activity_result", get_activity_result)
+    monkeypatch.setattr(store, "record_activity_result", record_activity_result)
+    return rows
+
+async def test_retry_returns_recorded_result_without_downstream_call(monkeypatch, ledger):
+    calls = []
+    async def carrier_dispatched(order):
+        calls.append(order["order_id"])
+        return "Dispatched"
+    monkeypatch.setattr(stubs, "carrier_dispatched", carrier_dispatched)
+
+    env = ActivityEnvironment()
+    order = {"order_id": "ord_ledger"}
+    assert await env.run(shipping_activities.dispatch_carrier, order) == "Dispatched"
+    env.info = dataclasses.replace(env.info, attempt=2)
+    assert await env.run(shipping_activities.dispatch_carrier, order) == "Dispatched"
+    assert calls == ["ord_ledger"]
@@ -0,0 +1,52 @@
+import pytest
+from temporalio.api.enums.v1 import EventType
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+from temporalio.client import Client
+from datetime import timedelta
+
+import app.config as config
+from app.domain import stubs
+from app.workflows.order_workflow import OrderWorkflow
+from app.workflows.shipping_workflow import ShippingWorkflow
+from app.activities import order_activities, shipping_activities
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture(autouse=True)
+def patch_flaky(monkeypatch):
+    async def noop():
+        return
+    monkeypatch.setattr(stubs, "flaky_call", noop)
+
+async def test_address_burst_is_written_once():
+    async with await WorkflowEnvironment.start_time_skipping() as env:
+        client: Client = env.client
+        async with Worker(client, task_queue=config.ORDERS_TQ, workflows=[OrderWorkflow],
+                          activities=[order_activities.receive_order, order_activities.validate_order,
+                                      order_activities.charge_payment, order_activities.mark_order_shipped,
+                                      order_activities.set_order_state, order_activities.update_order_address,
+                                      order_activities.append_event]):
+            async with Worker(client, task_queue=config.SHIPPING_TQ, workflows=[ShippingWorkflow],
+                              activities=[shipping_activities.prepare_package, shipping_activities.dispatch_carrier]):
+                order_id = "ord_address_burst"
+                handle = await client.start_workflow(
+                    OrderWorkflow.run,
+                    {"order_id": order_id, "payment_id": "pay_address_burst", "address": {}},
+                    id=f"order-{order_id}",
+                    task_queue=config.ORDERS_TQ,
+                    run_timeout=timedelta(seconds=config.RUN_TIMEOUT_SECS),
+                )
+                for i in range(10):
+                    await handle.signal(OrderWorkflow.update_address, {"line1": f"{i} Main St"})
+                await handle.signal(OrderWorkflow.approve)
+                assert (await handle.result())["status"] == "shipped"
+
+                history = await handle.fetch_history()
+                writes = [
+                    e for e in history.events
+                    if e.event_type == EventType.EVENT_TYPE_ACTIVITY_TASK_SCHEDULED
+                    and e.activity_task_scheduled_event_attributes.activity_type.name == "update_order_address"
+                ]
+                assert len(writes) == 1
+                assert b"9 Main St" in writes[0].activity_task_scheduled_event_attributes.input.payloads[1].data
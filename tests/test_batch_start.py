@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from temporalio.exceptions import WorkflowAlreadyStartedError
+
+import app.main as main
+
+class FakeHandle:
+    def __init__(self, id: str):
+        self.id = id
+        self.first_execution_run_id = f"run-{id}"
+
+class FakeClient:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+    async def start_workflow(self, fn, arg, *, id, **kwargs):
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            if arg["order_id"] == "dup":
+                raise WorkflowAlreadyStartedError(id, "OrderWorkflow")
+            if arg["order_id"] == "bad":
+                raise RuntimeError("boom")
+            return FakeHandle(id)
+        finally:
+            self.in_flight -= 1
+
+def test_batch_start_reports_per_item_results(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(main, "temporal_client", fake)
+    monkeypatch.setattr(main.config, "BATCH_CONCURRENCY", 4)
+    orders = [{"order_id": f"ord_{i}", "payment_id": f"pay_{i}"} for i in range(20)]
+    orders += [{"order_id": "dup", "payment_id": "pay_dup"}, {"order_id": "bad", "payment_id": "pay_bad"}]
+
+    resp = TestClient(main.app).post("/orders/start-batch", json={"orders": orders})
+    assert resp.status_code == 200
+    body = resp.json()
+    assert body["counts"] == {"started": 20, "already_exists": 1, "error": 1}
+    assert [r["order_id"] for r in body["results"]] == [o["order_id"] for o in orders]
+    assert body["results"][0]["workflow_id"] == "order-ord_0"
+    assert fake.max_in_flight <= 4
@@ -0,0 +1,73 @@
+import asyncio
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+from temporalio.service import RPCError, RPCStatusCode
+
+import app.main as main
+
+class FakeHandle:
+    def __init__(self, client, id: str):
+        self.client = client
+        self.id = id
+    async def signal(self, signal):
+        self.client.in_flight += 1
+        self.client.max_in_flight = max(self.client.max_in_flight, self.client.in_flight)
+        try:
+            await asyncio.sleep(0.001)
+            if self.id == "order-done":
+                raise RPCError("workflow execution already completed", RPCStatusCode.NOT_FOUND, b"")
+            self.client.signalled.append((self.id, signal.__name__))
+        finally:
+            self.client.in_flight -= 1
+
+class FakeClient:
+    def __init__(self, running=()):
+        self.running = list(running)
+        self.queries = []
+        self.signalled = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+    def get_workflow_handle(self, id):
+        return FakeHandle(self, id)
+    async def list_workflows(self, query, limit=None):
+        self.queries.append(query)
+        if "bogus" in query:
+            raise RPCError("invalid query", RPCStatusCode.INVALID_ARGUMENT, b"")
+        for wf_id in self.running[:limit]:
+            yield SimpleNamespace(id=wf_id)
+
+def test_approve_batch_by_ids(monkeypatch):
+    fake = FakeClient()
+    monkeypatch.setattr(main, "temporal_client", fake)
+    monkeypatch.setattr(main.config, "BATCH_CONCURRENCY", 3)
+    ids = [f"ord_{i}" for i in range(10)] + ["done", "ord_0"]
+
+    body = TestClient(main.app).post("/orders/approve-batch", json={"order_ids": ids}).json()
+    assert body["counts"] == {"signalled": 10, "not_found": 1}
+    assert sorted(fake.signalled) == sorted((f"order-ord_{i}", "approve") for i in range(10))
+    assert fake.max_in_flight <= 3
+
+def test_cancel_batch_by_step_uses_visibility_query(monkeypatch):
+    fake = FakeClient(running=["order-a", "order-b"])
+    monkeypatch.setattr(main, "temporal_client", fake)
+
+    body = TestClient(main.app).post("/orders/cancel-batch", json={"step": "manual_review"}).json()
+    assert [r["order_id"] for r in body["results"]] == ["a", "b"]
+    assert fake.queries == ["WorkflowType = 'OrderWorkflow' AND ExecutionStatus = 'Running' AND OrderStep = 'manual_review'"]
+    assert {s for _, s in fake.signalled} == {"cancel"}
+
+def test_bulk_signal_query_is_scoped_to_order_workflows(monkeypatch):
+    fake = FakeClient(running=["order-a"])
+    monkeypatch.setattr(main, "temporal_client", fake)
+    client = TestClient(main.app)
+
+    body = client.post("/orders/approve-batch", json={"query": "ExecutionStatus = 'Running' OR true"}).json()
+    assert body["counts"] == {"signalled": 1}
+    assert fake.queries == ["WorkflowType = 'OrderWorkflow' AND (ExecutionStatus = 'Running' OR true)"]
+    assert client.post("/orders/approve-batch", json={"query": "bogus"}).status_code == 400
+
+def test_bulk_signal_needs_exactly_one_target():
+    client = TestClient(main.app)
+    assert client.post("/orders/approve-batch", json={}).status_code == 422
+    assert client.post("/orders/approve-batch", json={"order_ids": ["a"], "step": "manual_review"}).status_code == 422
+    assert client.post("/orders/approve-batch", json={"step": "x' OR 'a'='a"}).status_code == 422
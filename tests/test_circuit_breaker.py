@@ -0,0 +1,131 @@
+import asyncio
+from datetime import timedelta
+
+import pytest
+from temporalio.exceptions import ApplicationError
+
+import app.config as config
+from app.activities.interceptors import _CircuitOpenActivityInbound
+from app.domain import breaker, stubs
+from app.domain.breaker import CircuitBreaker, CircuitOpenError
+
+pytestmark = pytest.mark.asyncio
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+async def ok() -> str:
+    return "ok"
+
+async def boom() -> str:
+    raise RuntimeError("down")
+
+async def fail(b: CircuitBreaker, times: int) -> None:
+    for _ in range(times):
+        with pytest.raises(RuntimeError):
+            await b.call(boom)
+
+async def test_opens_after_consecutive_failures_and_fails_fast():
+    clock = Clock()
+    b = CircuitBreaker("carrier", failure_threshold=3, reset_secs=2, clock=clock)
+    await fail(b, 2)
+    assert await b.call(ok) == "ok"  # a success resets the count
+    await fail(b, 3)
+    assert b.state == breaker.OPEN
+
+    clock.now += 0.5
+    called = []
+
+    async def tracked() -> str:
+        called.append(1)
+        return "ok"
+    with pytest.raises(CircuitOpenError) as err:
+        await b.call(tracked)
+    assert not called
+    assert err.value.retry_after == pytest.approx(1.5)
+    assert b.stats() == {"state": "open", "failures": 3, "opened": 1, "rejected": 1}
+
+async def test_half_open_trial_closes_or_reopens():
+    clock = Clock()
+    b = CircuitBreaker("payment", failure_threshold=1, reset_secs=2, clock=clock)
+    await fail(b, 1)
+    clock.now += 2
+    await fail(b, 1)  # the trial fails: open again for another reset period
+    assert b.state == breaker.OPEN and b.opened == 2
+    clock.now += 2
+
+    release = asyncio.Event()
+
+    async def slow() -> str:
+        await release.wait()
+        return "ok"
+    trial = asyncio.create_task(b.call(slow))
+    await asyncio.sleep(0)
+    assert b.state == breaker.HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        await b.call(ok)  # only one trial at a time
+    release.set()
+    assert await trial == "ok"
+    assert b.state == breaker.CLOSED
+
+async def test_late_failure_does_not_extend_open_period():
+    clock = Clock()
+    b = CircuitBreaker("orders", failure_threshold=1, reset_secs=2, clock=clock)
+    release = asyncio.Event()
+
+    async def slow_boom() -> str:
+        await release.wait()
+        raise RuntimeError("down")
+    straggler = asyncio.create_task(b.call(slow_boom))
+    await asyncio.sleep(0)
+    await fail(b, 1)
+    assert b.state == breaker.OPEN
+
+    clock.now += 1.5
+    release.set()
+    with pytest.raises(RuntimeError):
+        await straggler
+    assert b.opened == 1
+    clock.now += 0.5
+    assert await b.call(ok) == "ok"  # half-open on schedule, 2s after the first failure
+    assert b.state == breaker.CLOSED
+
+async def test_cancelled_call_counts_as_failure():
+    b = CircuitBreaker("carrier", failure_threshold=1, reset_secs=2)
+    task = asyncio.create_task(b.call(lambda: asyncio.sleep(300)))
+    await asyncio.sleep(0)
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert b.state == breaker.OPEN
+
+async def test_stub_fails_fast_while_dependency_is_open(monkeypatch):
+    monkeypatch.setattr(config, "BREAKER_FAILURE_THRESHOLD", 2)
+    breaker.reset()
+
+    async def down() -> None:
+        raise RuntimeError("carrier down")
+    monkeypatch.setattr(stubs, "flaky_call", down)
+    order = {"order_id": "ord_breaker"}
+    for _ in range(2):
+        with pytest.raises(RuntimeError):
+            await stubs.carrier_dispatched(order)
+    with pytest.raises(CircuitOpenError):
+        await stubs.carrier_dispatched(order)
+    assert breaker.stats()["carrier"]["state"] == "open"
+    breaker.reset()
+
+async def test_open_circuit_becomes_retryable_error_with_delay_hint():
+    class Next:
+        async def execute_activity(self, input):
+            raise CircuitOpenError("carrier", 1.25)
+
+    with pytest.raises(ApplicationError) as err:
+        await _CircuitOpenActivityInbound(Next()).execute_activity(None)
+    assert err.value.type == "CircuitOpen"
+    assert not err.value.non_retryable
+    assert err.value.next_retry_delay == timedelta(seconds=1.25)
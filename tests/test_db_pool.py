@@ -0,0 +1,61 @@
+import pytest
+
+import app.config as config
+from app import db
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture
+def pooled(monkeypatch):
+    monkeypatch.setattr(config, "DATABASE_URL", "postgresql+asyncpg://primary/db")
+    monkeypatch.setattr(config, "DATABASE_REPLICA_URL", "")
+    monkeypatch.setattr(config, "DB_POOL_SIZE", 3)
+    monkeypatch.setattr(config, "DB_MAX_OVERFLOW", 2)
+    # Fresh engines (never connected) and stats for this test; monkeypatch restores the originals
+    for name in ("_engine", "_autocommit_engine", "_sessionmaker", "_replica_engine", "_replica_autocommit_engine"):
+        monkeypatch.setattr(db, name, None)
+    monkeypatch.setattr(db, "_stats", db.PoolStats())
+
+class FakeConn:
+    def __init__(self, engine: "FakeEngine") -> None:
+        self.engine = engine
+    async def exec_driver_sql(self, sql: str) -> None:
+        pass
+    async def close(self) -> None:
+        self.engine.open -= 1
+
+class FakeEngine:
+    def __init__(self, fail_after: int | None = None) -> None:
+        self.fail_after = fail_after
+        self.connects = 0
+        self.open = 0
+    async def connect(self) -> FakeConn:
+        self.connects += 1
+        if self.fail_after is not None and self.connects > self.fail_after:
+            raise ConnectionError("too many clients")
+        self.open += 1
+        return FakeConn(self)
+
+async def test_pool_stats_in_pooled_mode(pooled):
+    stats = db.pool_stats()
+    assert stats["mode"] == "queue" and stats["size"] == 3 and stats["max_overflow"] == 2
+    assert stats["in_use"] == 0 and stats["connecting"] == 0 and stats["idle"] == 0
+    assert "replica" not in stats
+
+async def test_warm_up_is_clamped_to_pool_size_per_engine(pooled, monkeypatch):
+    primary, replica = FakeEngine(), FakeEngine()
+    monkeypatch.setattr(db, "get_engine", lambda: primary)
+    monkeypatch.setattr(db, "get_replica_engine", lambda: replica)
+    assert await db.warm_up(10) == 6
+    assert primary.connects == replica.connects == 3 and primary.open == replica.open == 0
+
+    monkeypatch.setattr(config, "DB_POOL_SIZE", 0)
+    assert await db.warm_up(10) == 0 and primary.connects == 3
+
+async def test_warm_up_closes_opened_connections_when_one_fails(pooled, monkeypatch):
+    primary = FakeEngine(fail_after=2)
+    monkeypatch.setattr(db, "get_engine", lambda: primary)
+    monkeypatch.setattr(db, "get_replica_engine", lambda: None)
+    with pytest.raises(ConnectionError):
+        await db.warm_up(3)
+    assert primary.connects == 3 and primary.open == 0
@@ -0,0 +1,83 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+import app.config as config
+from app import db
+
+pytestmark = pytest.mark.asyncio
+
+def probe_returning(*values):
+    calls = []
+
+    async def probe() -> float:
+        calls.append(1)
+        value = values[min(len(calls), len(values)) - 1]
+        if isinstance(value, Exception):
+            raise value
+        return value
+    return probe, calls
+
+async def test_guard_uses_replica_within_lag_and_caches_the_check():
+    guard = db.ReplicaLagGuard(max_lag_secs=2, check_interval_secs=60)
+    probe, calls = probe_returning(0.5)
+    assert await guard.use_replica(probe)
+    assert await guard.use_replica(probe)
+    assert len(calls) == 1
+
+async def test_guard_falls_back_when_lagging_or_unreachable():
+    guard = db.ReplicaLagGuard(max_lag_secs=2, check_interval_secs=0)
+    probe, _ = probe_returning(5.0, RuntimeError("replica down"), 0.1)
+    assert not await guard.use_replica(probe)
+    assert not await guard.use_replica(probe)
+    assert guard.lag_secs is None
+    assert await guard.use_replica(probe)
+    assert guard.fallbacks == 2
+
+async def test_guard_falls_back_when_replica_is_not_streaming():
+    guard = db.ReplicaLagGuard(max_lag_secs=2, check_interval_secs=0)
+    probe, _ = probe_returning(None, 0.0)
+    assert not await guard.use_replica(probe)
+    assert guard.lag_secs is None
+    assert await guard.use_replica(probe)
+
+async def test_reads_use_primary_while_replica_is_not_streaming(monkeypatch):
+    monkeypatch.setattr(config, "DATABASE_REPLICA_URL", "postgresql+asyncpg://replica/db")
+    monkeypatch.setattr(db, "_lag_guard", db.ReplicaLagGuard(max_lag_secs=2, check_interval_secs=0))
+    probe, _ = probe_returning(None, 0.0)  # the lag query's NULL: WAL receiver not streaming
+    monkeypatch.setattr(db, "_replica_lag", probe)
+    routed = []
+
+    class Result:
+        def mappings(self):
+            return self
+        def first(self):
+            return {"n": 1}
+
+    class Conn:
+        async def execute(self, *args):
+            return Result()
+
+    @asynccontextmanager
+    async def connect(replica: bool = False):
+        routed.append(replica)
+        yield Conn()
+    monkeypatch.setattr(db, "connect", connect)
+
+    assert await db.fetchone("SELECT 1 AS n") == {"n": 1}
+    assert await db.fetchone("SELECT 1 AS n") == {"n": 1}
+    assert routed == [False, True]
+
+async def test_reads_route_to_replica_unless_primary_forced(monkeypatch):
+    monkeypatch.setattr(config, "DATABASE_REPLICA_URL", "postgresql+asyncpg://replica/db")
+    guard = db.ReplicaLagGuard(max_lag_secs=2, check_interval_secs=60)
+    monkeypatch.setattr(db, "_lag_guard", guard)
+
+    async def caught_up() -> float:
+        return 0.0
+    monkeypatch.setattr(db, "_replica_lag", caught_up)
+
+    assert await db._read_from_replica(primary=False)
+    assert not await db._read_from_replica(primary=True)
+    monkeypatch.setattr(config, "DATABASE_REPLICA_URL", "")
+    assert not await db._read_from_replica(primary=False)
@@ -0,0 +1,49 @@
+import json
+import pytest
+
+from app import main
+from app.event_feed import EventFeed, StreamCursor
+
+pytestmark = pytest.mark.asyncio
+
+async def test_notify_wakes_only_that_orders_subscribers(monkeypatch):
+    feed = EventFeed("order_events")
+    monkeypatch.setattr(feed, "start", lambda: None)
+    async with feed.subscribe("ord_a") as a, feed.subscribe("ord_b") as b:
+        assert feed.stats()["subscribers"] == 2
+        feed._on_notify(None, 0, "order_events", json.dumps({"order_id": "ord_a", "id": 7}))
+        feed._on_notify(None, 0, "order_events", "not json")
+        assert a.is_set() and not b.is_set()
+    assert feed.stats()["orders"] == 0
+
+def row(id_: int) -> dict:
+    return {"id": id_, "order_id": "ord_a", "type": f"e{id_}", "payload_json": {}, "ts": None}
+
+async def test_cursor_delivers_lower_id_that_commits_late():
+    cursor = StreamCursor(0)
+    # id 2 was inserted before id 3 but its transaction hadn't committed at the first read
+    assert [r["id"] for r in cursor.accept([row(1), row(3)])] == [1, 3]
+    assert cursor.after == 3
+    assert [r["id"] for r in cursor.accept([row(1), row(2), row(3)])] == [2]
+    assert cursor.after == 3
+    assert cursor.accept([row(2), row(3)]) == []
+    assert [r["id"] for r in cursor.accept([row(3), row(4)])] == [4]
+
+async def test_stream_sends_late_commit_without_moving_resume_id_back(monkeypatch):
+    reads = [[row(1), row(3)], [row(1), row(2), row(3)]]
+
+    async def list_events_for_stream(order_id, after, window_secs, limit):
+        return reads.pop(0) if reads else []
+    monkeypatch.setattr(main.store, "list_events_for_stream", list_events_for_stream)
+    monkeypatch.setattr(main.event_feed, "start", lambda: None)
+    monkeypatch.setattr(main.config, "EVENT_STREAM_HEARTBEAT_SECS", 0.01)
+
+    class Request:
+        async def is_disconnected(self) -> bool:
+            return not reads
+
+    messages = [m async for m in main.event_stream("ord_a", 0, Request())]
+    sent = [json.loads(m.split("data: ")[1])["id"] for m in messages if m.startswith("id:")]
+    resume_ids = [int(m.split("\n")[0][4:]) for m in messages if m.startswith("id:")]
+    assert sent == [1, 3, 2]
+    assert resume_ids == [1, 3, 3]
@@ -0,0 +1,23 @@
+from datetime import date, datetime, timezone
+
+from app.maintenance import Partition, day_start, expired, partition_name
+
+def _daily(day: date) -> Partition:
+    return Partition(partition_name(day), f"FOR VALUES FROM ('{day} 00:00:00+00') TO ('{date.fromordinal(day.toordinal() + 1)} 00:00:00+00')")
+
+def test_expired_only_returns_ranges_ended_before_cutoff():
+    legacy = Partition("events_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-09-02 00:00:00+00')")
+    default = Partition("events_default", "DEFAULT")
+    old, edge, recent = _daily(date(2026, 9, 2)), _daily(date(2026, 9, 30)), _daily(date(2026, 10, 1))
+    cutoff = day_start(date(2026, 10, 1))
+    assert [p.name for p in expired([legacy, default, old, edge, recent], cutoff)] == [
+        "events_legacy", "events_p20260902", "events_p20260930",
+    ]
+
+def test_covers_handles_minvalue_and_default():
+    legacy = Partition("events_legacy", "FOR VALUES FROM (MINVALUE) TO ('2026-10-19 00:00:00+00')")
+    assert legacy.covers(datetime(2020, 1, 1, tzinfo=timezone.utc))
+    assert legacy.covers(day_start(date(2026, 10, 18)))
+    assert not legacy.covers(day_start(date(2026, 10, 19)))
+    assert not Partition("events_default", "DEFAULT").covers(day_start(date(2026, 10, 19)))
+    assert _daily(date(2026, 10, 19)).covers(datetime(2026, 10, 19, 23, 59, tzinfo=timezone.utc))
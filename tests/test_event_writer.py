@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+
+from app.domain.event_writer import EventWriter, pending_events
+
+pytestmark = pytest.mark.asyncio
+
+class Sink:
+    def __init__(self, fail: bool = False):
+        self.batches: list[list] = []
+        self.fail = fail
+    async def __call__(self, rows):
+        if self.fail:
+            raise RuntimeError("db down")
+        self.batches.append(rows)
+
+async def test_flushes_multi_row_batch_on_size():
+    sink = Sink()
+    writer = EventWriter(sink, max_batch=3, max_delay=10)
+    futs = [writer.submit("ord_1", f"e{i}", {}) for i in range(3)]
+    await asyncio.wait_for(asyncio.gather(*futs), timeout=1)
+    assert sink.batches == [[("ord_1", "e0", {}), ("ord_1", "e1", {}), ("ord_1", "e2", {})]]
+    await writer.close()
+
+async def test_flush_before_complete_waits_only_for_own_events():
+    sink = Sink()
+    writer = EventWriter(sink, max_batch=100, max_delay=10)
+    writer.submit("ord_other", "background", {})
+    pending: list = []
+    token = pending_events.set(pending)
+    try:
+        writer.submit("ord_1", "mine", {"a": 1})
+    finally:
+        pending_events.reset(token)
+    assert len(pending) == 1
+    await asyncio.wait_for(writer.wait_for(pending), timeout=1)
+    assert [r[1] for r in sink.batches[0]] == ["background", "mine"]
+    await writer.close()
+
+async def test_flush_failure_reaches_waiting_activity():
+    writer = EventWriter(Sink(fail=True), max_batch=100, max_delay=0.01)
+    fut = writer.submit("ord_1", "lost", {})
+    with pytest.raises(RuntimeError):
+        await asyncio.wait_for(writer.wait_for([fut]), timeout=1)
+    await writer.close()
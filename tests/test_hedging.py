@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+import app.config as config
+from app.domain import hedging
+
+pytestmark = pytest.mark.asyncio
+
+def hedger(**kwargs) -> hedging.Hedger:
+    opts = dict(percentile=95, initial_delay=0.05, min_delay=0.01, max_delay=0.2, window=50, min_samples=5)
+    opts.update(kwargs)
+    return hedging.Hedger("test", **opts)
+
+def scripted(*steps):
+    """A call whose n-th invocation sleeps/raises per steps[n]; records cancellations."""
+    calls, cancelled = [], []
+
+    async def call() -> str:
+        n = len(calls)
+        calls.append(n)
+        delay, result = steps[n]
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(n)
+            raise
+        if isinstance(result, Exception):
+            raise result
+        return result
+    return call, calls, cancelled
+
+async def test_fast_call_is_not_hedged():
+    h = hedger()
+    call, calls, _ = scripted((0, "primary"))
+    assert await h.run(call) == "primary"
+    assert calls == [0] and h.hedged == 0
+
+async def test_slow_primary_is_hedged_and_cancelled():
+    h = hedger()
+    call, calls, cancelled = scripted((10, "primary"), (0, "hedge"))
+    assert await h.run(call) == "hedge"
+    await asyncio.sleep(0)
+    assert calls == [0, 1] and cancelled == [0]
+    assert h.stats()["hedge_wins"] == 1 and h.stats()["hedge_rate"] == 1.0
+
+async def test_failed_attempt_waits_for_the_other():
+    h = hedger()
+    call, _, _ = scripted((0.08, RuntimeError("boom")), (0.1, "hedge"))
+    assert await h.run(call) == "hedge"
+
+    # Both fail: the first failure is raised once the other has failed too
+    call, calls, _ = scripted((0.06, RuntimeError("first")), (0.1, RuntimeError("second")))
+    with pytest.raises(RuntimeError, match="first"):
+        await hedger().run(call)
+    assert calls == [0, 1]
+
+def outcomes(name: str, outcome: str) -> float:
+    return REGISTRY.get_sample_value("trellis_hedge_calls_total", {"call": name, "outcome": outcome}) or 0.0
+
+async def test_fast_failure_counts_as_failed_and_is_not_a_latency_sample():
+    h = hedging.Hedger("fast_fail", percentile=95, initial_delay=0.05, min_delay=0.01, max_delay=0.2,
+                       window=50, min_samples=5)
+    for _ in range(5):
+        call, _, _ = scripted((0, RuntimeError("down")))
+        with pytest.raises(RuntimeError):
+            await h.run(call)
+    assert outcomes("fast_fail", "failed") == 5 and outcomes("fast_fail", "not_hedged") == 0
+    assert not h._latencies and h.delay() == 0.05
+
+    # Hedged, both fail: neither failure is a latency sample
+    call, _, _ = scripted((0.06, RuntimeError("first")), (0.01, RuntimeError("second")))
+    with pytest.raises(RuntimeError):
+        await h.run(call)
+    assert not h._latencies and outcomes("fast_fail", "failed") == 6
+
+async def test_delay_tracks_recent_latency_within_bounds():
+    h = hedger()
+    assert h.delay() == 0.05
+    for _ in range(5):
+        call, _, _ = scripted((0.03, "ok"))
+        await h.run(call)
+    assert 0.03 <= h.delay() < 0.05
+    h._latencies.extend([5.0] * 50)
+    assert h.delay() == 0.2
+
+async def test_only_configured_calls_are_hedged(monkeypatch):
+    monkeypatch.setattr(config, "HEDGE_CALLS", "carrier_dispatched")
+    hedging.reset()
+    assert hedging.get("carrier_dispatched") is not None
+    assert hedging.get("payment_charged") is None
+    call, calls, _ = scripted((0, "direct"))
+    assert await hedging.call("payment_charged", call) == "direct"
+    assert "payment_charged" not in hedging.stats()
+    hedging.reset()
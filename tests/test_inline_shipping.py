@@ -0,0 +1,45 @@
+import pytest
+from temporalio.api.enums.v1 import EventType
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+from temporalio.client import Client
+from datetime import timedelta
+
+import app.config as config
+from app.domain import stubs
+from app.workers import order_worker
+from app.workflows.order_workflow import OrderWorkflow
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture(autouse=True)
+def patch_flaky(monkeypatch):
+    async def noop():
+        return
+    monkeypatch.setattr(stubs, "flaky_call", noop)
+
+async def test_inline_shipping_needs_no_child_or_shipping_worker():
+    async with await WorkflowEnvironment.start_time_skipping() as env:
+        client: Client = env.client
+        async with Worker(client, task_queue=config.ORDERS_TQ, workflows=[OrderWorkflow],
+                          activities=order_worker.ACTIVITIES):
+            order_id = "ord_inline_ship"
+            handle = await client.start_workflow(
+                OrderWorkflow.run,
+                {"order_id": order_id, "payment_id": "pay_inline_ship", "address": {}, "shipping": "inline"},
+                id=f"order-{order_id}",
+                task_queue=config.ORDERS_TQ,
+                run_timeout=timedelta(seconds=config.RUN_TIMEOUT_SECS),
+            )
+            await handle.signal(OrderWorkflow.approve)
+            assert (await handle.result())["status"] == "shipped"
+
+            history = await handle.fetch_history()
+            types = {e.event_type for e in history.events}
+            assert EventType.EVENT_TYPE_START_CHILD_WORKFLOW_EXECUTION_INITIATED not in types
+            scheduled = [
+                e.activity_task_scheduled_event_attributes.activity_type.name
+                for e in history.events
+                if e.event_type == EventType.EVENT_TYPE_ACTIVITY_TASK_SCHEDULED
+            ]
+            assert "prepare_package" in scheduled and "dispatch_carrier" in scheduled
@@ -0,0 +1,60 @@
+import json
+import pytest
+from temporalio.api.enums.v1 import EventType
+from temporalio.testing import WorkflowEnvironment
+from temporalio.worker import Worker
+from temporalio.client import Client
+from datetime import timedelta
+
+import app.config as config
+from app.domain import stubs
+from app.workflows.order_workflow import OrderWorkflow
+from app.workflows.shipping_workflow import ShippingWorkflow
+from app.activities import order_activities, shipping_activities
+
+pytestmark = pytest.mark.asyncio
+
+@pytest.fixture(autouse=True)
+def patch_flaky(monkeypatch):
+    async def noop():
+        return
+    monkeypatch.setattr(stubs, "flaky_call", noop)
+
+async def test_cancel_with_local_bookkeeping_skips_task_queue():
+    async with await WorkflowEnvironment.start_time_skipping() as env:
+        client: Client = env.client
+        async with Worker(client, task_queue=config.ORDERS_TQ, workflows=[OrderWorkflow],
+                          activities=[order_activities.receive_order, order_activities.validate_order,
+                                      order_activities.charge_payment, order_activities.mark_order_shipped,
+                                      order_activities.set_order_state, order_activities.update_order_address,
+                                      order_activities.append_event]):
+            async with Worker(client, task_queue=config.SHIPPING_TQ, workflows=[ShippingWorkflow],
+                              activities=[shipping_activities.prepare_package, shipping_activities.dispatch_carrier]):
+                order_id = "ord_local_bookkeeping"
+                handle = await client.start_workflow(
+                    OrderWorkflow.run,
+                    {"order_id": order_id, "payment_id": "pay_local_bookkeeping", "address": {}, "bookkeeping": "local"},
+                    id=f"order-{order_id}",
+                    task_queue=config.ORDERS_TQ,
+                    run_timeout=timedelta(seconds=config.RUN_TIMEOUT_SECS),
+                )
+                await handle.signal(OrderWorkflow.cancel)
+                result = await handle.result()
+                assert result["status"] == "cancelled"
+
+                history = await handle.fetch_history()
+                scheduled = [
+                    e.activity_task_scheduled_event_attributes.activity_type.name
+                    for e in history.events
+                    if e.event_type == EventType.EVENT_TYPE_ACTIVITY_TASK_SCHEDULED
+                ]
+                assert "set_order_state" not in scheduled
+                # The local activity result is recorded as a marker instead. Other markers (e.g. the
+                # workflow.patched ones) are recorded on every run, so match the local-activity marker.
+                local_activities = [
+                    json.loads(e.marker_recorded_event_attributes.details["data"].payloads[0].data)["activity_type"]
+                    for e in history.events
+                    if e.event_type == EventType.EVENT_TYPE_MARKER_RECORDED
+                    and e.marker_recorded_event_attributes.marker_name == "core_local_activity"
+                ]
+                assert "set_order_state" in local_activities
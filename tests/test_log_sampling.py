@@ -0,0 +1,19 @@
+import pytest
+import structlog
+
+from app.logging_setup import SampleLogs, parse_sample_rates
+
+def test_parse_sample_rates():
+    assert parse_sample_rates(" activity_receive_order=0.1, activity_*=2 ,bad") == {
+        "activity_receive_order": 0.1, "activity_*": 1.0,
+    }
+
+def test_sampling_drops_info_but_keeps_errors():
+    sample = SampleLogs({"activity_receive_order": 0.0, "activity_*": 0.5}, rand=lambda: 0.7)
+    with pytest.raises(structlog.DropEvent):
+        sample(None, "info", {"event": "activity_receive_order"})
+    with pytest.raises(structlog.DropEvent):
+        sample(None, "info", {"event": "activity_validate_order"})
+    assert sample(None, "error", {"event": "activity_receive_order_error"})
+    assert sample(None, "info", {"event": "worker_starting"})
+    assert SampleLogs({"activity_*": 0.5}, rand=lambda: 0.2)(None, "info", {"event": "activity_x"})
@@ -0,0 +1,17 @@
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app import db
+
+def test_metrics_endpoint_exposes_route_and_store_histograms(monkeypatch):
+    async def fetchall(sql, params=None, *, primary=False):
+        return [{"state": "shipped", "n": 2}]
+    monkeypatch.setattr(db, "fetchall", fetchall)
+    client = TestClient(main.app)
+
+    assert client.get("/orders/stats").json() == {"counts": {"shipped": 2}, "total": 2}
+    resp = client.get("/metrics/")
+    assert resp.status_code == 200
+    assert 'trellis_http_request_duration_seconds_count{method="GET",route="/orders/stats",status="200"}' in resp.text
+    assert 'trellis_store_duration_seconds_count{op="get_order_state_counts"}' in resp.text
+    assert "trellis_db_pool_in_use" in resp.text
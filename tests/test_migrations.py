@@ -0,0 +1,18 @@
+import re
+
+import pytest
+
+from app.migrate import MIGRATIONS_DIR, _split_sql
+
+STATEMENT_START = re.compile(r"^(CREATE|ALTER|DROP|INSERT|UPDATE|DELETE|DO|SELECT|WITH|COMMENT)\b", re.I)
+
+@pytest.mark.parametrize("path", sorted(MIGRATIONS_DIR.glob("*.sql")), ids=lambda p: p.name)
+def test_migration_splits_into_whole_statements(path):
+    statements = _split_sql(path.read_text())
+    assert statements
+    for stmt in statements:
+        assert STATEMENT_START.match(stmt), stmt[:80]
+
+def test_semicolons_in_comments_do_not_split():
+    sql = "-- first; second\nCREATE TABLE t (id INT); -- trailing; note\nDO $$ BEGIN PERFORM 1; END $$;"
+    assert _split_sql(sql) == ["CREATE TABLE t (id INT)", "DO $$ BEGIN PERFORM 1; END $$"]
@@ -0,0 +1,27 @@
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.domain import store
+
+ORDERS = [{"id": f"ord_{i:02d}", "state": "shipped" if i % 2 else "received"} for i in range(10)]
+
+def test_list_orders_keyset_pages(monkeypatch):
+    async def list_orders(state, after, limit):
+        rows = [o for o in ORDERS if (state is None or o["state"] == state) and o["id"] > after]
+        return rows[:limit]
+    monkeypatch.setattr(store, "list_orders", list_orders)
+    client = TestClient(main.app)
+
+    first = client.get("/orders", params={"state": "shipped", "limit": 3}).json()
+    assert [o["id"] for o in first["orders"]] == ["ord_01", "ord_03", "ord_05"]
+    assert first["next_after"] == "ord_05"
+    rest = client.get("/orders", params={"state": "shipped", "limit": 3, "after": first["next_after"]}).json()
+    assert [o["id"] for o in rest["orders"]] == ["ord_07", "ord_09"]
+    assert rest["next_after"] is None
+
+def test_order_stats(monkeypatch):
+    async def get_order_state_counts():
+        return {"received": 5, "shipped": 5}
+    monkeypatch.setattr(store, "get_order_state_counts", get_order_state_counts)
+    resp = TestClient(main.app).get("/orders/stats")
+    assert resp.json() == {"counts": {"received": 5, "shipped": 5}, "total": 10}
@@ -0,0 +1,50 @@
+import base64, zlib
+import pytest
+from fastapi.testclient import TestClient
+
+import app.main as main
+from app.converter import ZLIB_ENCODING, CompressionCodec, data_converter
+
+pytestmark = pytest.mark.asyncio
+
+ORDER = {"order_id": "ord_big", "items": [{"sku": f"SKU-{i}", "qty": 1} for i in range(200)], "address": {"line1": "1 Main"}}
+
+async def test_round_trip_compresses_only_large_payloads():
+    conv = data_converter("orjson", 256)
+    payloads = await conv.encode([ORDER, "small", None])
+    assert [p.metadata["encoding"] for p in payloads] == [ZLIB_ENCODING, b"json/plain", b"binary/null"]
+    assert await conv.decode(payloads, [dict, str, type(None)]) == [ORDER, "small", None]
+
+async def test_orjson_payloads_read_by_default_converter():
+    payloads = await data_converter("orjson", 0).encode([ORDER])
+    assert await data_converter("json", 0).decode(payloads, [dict]) == [ORDER]
+
+async def test_codec_endpoint_decodes_for_tooling(monkeypatch):
+    monkeypatch.setattr(main, "payload_codec", CompressionCodec(256))
+    [encoded] = await data_converter("orjson", 256).encode([ORDER])
+    body = {"payloads": [{"metadata": {"encoding": base64.b64encode(ZLIB_ENCODING).decode()},
+                          "data": base64.b64encode(encoded.data).decode()}]}
+    resp = TestClient(main.app).post("/codec/decode", json=body)
+    [decoded] = resp.json()["payloads"]
+    assert base64.b64decode(decoded["metadata"]["encoding"]) == b"json/plain"
+
+def _zlib_body(data: bytes) -> dict:
+    return {"payloads": [{"metadata": {"encoding": base64.b64encode(ZLIB_ENCODING).decode()},
+                          "data": base64.b64encode(data).decode()}]}
+
+async def test_codec_decode_rejects_decompression_bomb(monkeypatch):
+    monkeypatch.setattr(main, "payload_codec", CompressionCodec(256, max_decompressed_bytes=1024))
+    resp = TestClient(main.app).post("/codec/decode", json=_zlib_body(zlib.compress(b"\0" * 1_000_000)))
+    assert resp.status_code == 413
+
+async def test_codec_decode_rejects_corrupt_payload(monkeypatch):
+    monkeypatch.setattr(main, "payload_codec", CompressionCodec(256))
+    client = TestClient(main.app)
+    assert client.post("/codec/decode", json=_zlib_body(b"not zlib")).status_code == 400
+    assert client.post("/codec/decode", json=_zlib_body(zlib.compress(b"x" * 64)[:-6])).status_code == 400
+
+@pytest.mark.parametrize("path", ["/codec/encode", "/codec/decode"])
+@pytest.mark.parametrize("body", [b"not json", b"[1, 2]", b'{"payloads": 3}', b'{"nope": 1}'])
+async def test_codec_endpoints_reject_malformed_bodies(path, body):
+    resp = TestClient(main.app).post(path, content=body, headers={"content-type": "application/json"})
+    assert resp.status_code == 400
@@ -0,0 +1,33 @@
+from app.cache import TTLCache
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+    def __call__(self):
+        return self.now
+
+def test_entries_expire_after_ttl():
+    clock = Clock()
+    cache = TTLCache(ttl=1.0, max_entries=10, clock=clock)
+    cache.set("ord_1", {"state": "received"})
+    clock.now = 0.5
+    assert cache.get("ord_1") == {"state": "received"}
+    clock.now = 1.0
+    assert cache.get("ord_1") is None
+    assert len(cache) == 0
+
+def test_evicts_least_recently_used():
+    cache = TTLCache(ttl=60, max_entries=2, clock=Clock())
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+def test_invalidate():
+    cache = TTLCache(ttl=60, max_entries=2, clock=Clock())
+    cache.set("a", 1)
+    cache.invalidate("a")
+    cache.invalidate("missing")
+    assert cache.get("a") is None
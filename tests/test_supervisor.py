@@ -0,0 +1,107 @@
+import pytest
+
+import app.config as config
+from app.workers import supervisor
+from app.workers.supervisor import HEALTHY_AFTER_SECS, MAX_RESTART_DELAY_SECS, Supervisor, restart_delay
+
+class FakeProcess:
+    def __init__(self, alive: bool = True, exits_on_terminate: bool = True) -> None:
+        self.alive = alive
+        self.exits_on_terminate = exits_on_terminate
+        self.pid = 4242
+        self.exitcode = None if alive else 1
+        self.calls: list[str] = []
+
+    def is_alive(self) -> bool:
+        return self.alive
+
+    def terminate(self) -> None:
+        self.calls.append("terminate")
+        self.alive = not self.exits_on_terminate
+
+    def kill(self) -> None:
+        self.calls.append("kill")
+        self.alive = False
+
+    def join(self, timeout: float | None = None) -> None:
+        self.calls.append("join")
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def __call__(self) -> float:
+        return self.now
+
+@pytest.fixture
+def clock(monkeypatch):
+    c = Clock()
+    monkeypatch.setattr(supervisor.time, "monotonic", c)
+    return c
+
+@pytest.fixture
+def started(monkeypatch):
+    """Replace process spawning: _start hands each slot a live FakeProcess."""
+    procs: list[FakeProcess] = []
+
+    def start(self, slot):
+        slot.process = FakeProcess()
+        slot.started_at = supervisor.time.monotonic()
+        procs.append(slot.process)
+    monkeypatch.setattr(Supervisor, "_start", start)
+    return procs
+
+def test_restart_delay_doubles_and_caps():
+    assert [restart_delay(n) for n in range(1, 6)] == [0.5, 1.0, 2.0, 4.0, 8.0]
+    assert restart_delay(20) == MAX_RESTART_DELAY_SECS
+
+def test_crashing_child_is_restarted_with_backoff(clock, started):
+    sup = Supervisor(["order"], 1)
+    slot = sup._slots[0]
+    sup._start(slot)
+
+    delays = []
+    for _ in range(3):
+        slot.process.alive = False
+        clock.now += 1  # crashes quickly, so failures keep counting up
+        sup._check(slot)
+        assert slot.process is None
+        delays.append(slot.restart_at - clock.now)
+        sup._check(slot)  # still backing off: not restarted yet
+        assert slot.process is None
+        clock.now = slot.restart_at
+        sup._check(slot)
+        assert slot.process is not None
+    assert delays == [0.5, 1.0, 2.0]
+
+def test_backoff_resets_after_healthy_run(clock, started):
+    sup = Supervisor(["shipping"], 1)
+    slot = sup._slots[0]
+    sup._start(slot)
+    slot.failures = 4
+    clock.now += HEALTHY_AFTER_SECS
+    slot.process.alive = False
+    sup._check(slot)
+    assert slot.failures == 1
+    assert slot.restart_at - clock.now == 0.5
+
+def test_shutdown_terminates_then_kills_stragglers(clock):
+    sup = Supervisor(["order", "shipping"], 1)
+    polite, stuck = FakeProcess(), FakeProcess(exits_on_terminate=False)
+    sup._slots[0].process, sup._slots[1].process = polite, stuck
+    sup._shutdown()
+    assert polite.calls == ["terminate", "join"]
+    assert stuck.calls == ["terminate", "join", "kill", "join"]
+
+def test_slots_and_indexes_cover_every_kind():
+    sup = Supervisor(["order", "shipping"], 2)
+    assert [(s.kind, s.index) for s in sup._slots] == [
+        ("order", 0), ("order", 1), ("shipping", 2), ("shipping", 3),
+    ]
+
+def test_metrics_ports_offset_by_child_index(monkeypatch):
+    monkeypatch.setattr(config, "METRICS_PORT", 9100)
+    monkeypatch.setattr(config, "TEMPORAL_METRICS_PORT", 0)
+    supervisor.offset_metrics_ports(3)
+    assert config.METRICS_PORT == 9103
+    assert config.TEMPORAL_METRICS_PORT == 0  # disabled stays disabled
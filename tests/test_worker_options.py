@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import app.config as config
+from app.workers.options import describe, worker_options
+
+def test_fixed_slots_come_from_config(monkeypatch):
+    monkeypatch.setattr(config, "WORKER_TUNER", "fixed")
+    monkeypatch.setattr(config, "WORKER_MAX_CONCURRENT_ACTIVITIES", 40)
+    monkeypatch.setattr(config, "WORKER_MAX_CONCURRENT_WORKFLOW_TASKS", 8)
+    monkeypatch.setattr(config, "WORKER_ACTIVITY_EXECUTOR_THREADS", 0)
+    opts = worker_options()
+    assert opts["max_concurrent_activities"] == 40
+    assert opts["max_concurrent_workflow_tasks"] == 8
+    assert "tuner" not in opts and "activity_executor" not in opts
+
+def test_resource_tuner_replaces_fixed_slots(monkeypatch):
+    monkeypatch.setattr(config, "WORKER_TUNER", "resource")
+    monkeypatch.setattr(config, "WORKER_ACTIVITY_EXECUTOR_THREADS", 4)
+    opts = worker_options()
+    assert "tuner" in opts
+    assert "max_concurrent_activities" not in opts
+    assert isinstance(opts["activity_executor"], ThreadPoolExecutor)
+    opts["activity_executor"].shutdown()
+
+    logged = describe(opts)
+    assert "activity_executor" not in logged
+    assert logged["tuner"] == "resource"
+    assert logged["activity_executor_threads"] == 4
+    assert logged["max_concurrent_activities"] == config.WORKER_MAX_CONCURRENT_ACTIVITIES
@@ -0,0 +1,24 @@
+import subprocess, sys
+
+import pytest
+from temporalio import workflow
+
+from app.workflows.order_workflow import OrderWorkflow
+from app.workflows.sandbox import workflow_runner
+from app.workflows.shipping_workflow import ShippingWorkflow
+
+pytestmark = pytest.mark.asyncio
+
+async def test_workflows_load_under_passthrough_runner():
+    runner = workflow_runner()
+    for wf in (OrderWorkflow, ShippingWorkflow):
+        runner.prepare_workflow(workflow._Definition.must_from_class(wf))
+
+async def test_workflow_modules_do_not_import_activity_dependencies():
+    code = (
+        "import sys, app.workflows.order_workflow, app.workflows.shipping_workflow\n"
+        "print(','.join(m for m in ('app.activities', 'app.db', 'app.domain.store', 'sqlalchemy', 'structlog')"
+        " if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ""